@@ -2,6 +2,7 @@
 统一配置文件 - Redis 和 MySQL 配置
 所有数据库和缓存相关的配置都在这里统一管理
 """
+import functools
 import os
 
 # ============ 基础配置 ============
@@ -27,38 +28,79 @@ class BaseConfig:
     REDIS_DB = 0
     REDIS_PASSWORD = None  # 如果Redis设置了密码，在这里配置
     REDIS_DECODE_RESPONSES = True
+    REDIS_RESULT_DB = 2  # Celery 结果后端使用的 Redis 数据库，与 broker 分开
+    CELERY_RESULT_EXPIRES = 24 * 3600  # 任务结果在 Redis 中的保留时间（秒）
+    SQL_CACHE_TTL = 30  # fetch_one_cached/fetch_all_cached 查询结果在 Redis 中的保留时间（秒）
+    SQL_CACHE_MAX_BYTES = 256 * 1024  # 序列化后超过该大小的查询结果不写入缓存
     
     # ============ 连接池配置 ============
-    # MySQL 连接池配置
+    # MySQL 连接池配置（SQLAlchemy 引擎连接池）
     MYSQL_POOL_MAX_CONNECTIONS = 10
-    MYSQL_POOL_MIN_CACHED = 2
-    MYSQL_POOL_MAX_CACHED = 5
-    MYSQL_POOL_MAX_SHARED = 8
-    MYSQL_POOL_BLOCKING = True
-    MYSQL_POOL_PING = 0
+    MYSQL_POOL_MAX_OVERFLOW = 0  # 连接数封顶为 MYSQL_POOL_MAX_CONNECTIONS，用满后阻塞等待
+    MYSQL_POOL_TIMEOUT = 30  # 等待空闲连接的最长时间（秒）
+    MYSQL_POOL_RECYCLE = 3600
     
     # Redis 连接池配置
     REDIS_POOL_MAX_CONNECTIONS = 20
     REDIS_POOL_RETRY_ON_TIMEOUT = True
+    REDIS_POOL_TIMEOUT = 20  # 连接池用满时等待空闲连接的最长时间（秒）
+    REDIS_SOCKET_TIMEOUT = 5  # 读写超时（秒），避免 Redis 异常时调用方无限挂起
+    REDIS_SOCKET_CONNECT_TIMEOUT = 5  # 建连超时（秒）
+    REDIS_SOCKET_KEEPALIVE = True
+    REDIS_HEALTH_CHECK_INTERVAL = 30  # 空闲连接复用前的健康检查间隔（秒）
+    REDIS_RETRY_ATTEMPTS = 3  # 连接/超时错误的重试次数（指数退避）
+    
+    # ============ 招标作答配置 ============
+    BID_ANSWER_MAX_WORKERS = 4  # 批量作答的并发线程数；每个线程最多同时占用两个 MySQL 连接（作答连接 + 向量检索的流式读取），加上请求本身的连接不能超过 MYSQL_POOL_MAX_CONNECTIONS
+    BID_ANSWER_BATCH_SIZE = 16  # 异步作答时每个 Celery 子任务处理的技术要求条数
+    BID_PARSED_DOCUMENT_CACHE_SIZE = 16  # 进程内缓存的已解析招标文档数，文件修改时间或大小变化后重新解析
+    BID_EXPORT_FOLDER = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'uploads', 'exports'))  # 导出的应答文档（Web 进程与 Celery worker 共享）
+    BID_EXPORT_RETENTION = CELERY_RESULT_EXPIRES  # 导出文档最长保留时间（秒）：下载后立即删除，未被下载的超时后在下次导出时清理；任务结果过期后文件已无法下载
+    BID_EXPORT_COMPRESSLEVEL = 1  # 导出文档的 zip 压缩级别（zlib 1-9）；导出文件下载后即弃，优先省 CPU
+    
+    # ============ 文档对话配置 ============
+    CHAT_BATCH_SEARCH_MAX_WORKERS = 4  # 批量搜索的并发线程数；每个线程占用一个 MySQL 连接，加上请求本身的连接不能超过 MYSQL_POOL_MAX_CONNECTIONS
     
     # ============ 生成连接字符串的方法 ============
     @classmethod
+    def _build_mysql_uri(cls, scheme):
+        """本机存在 MySQL socket 文件时走 UNIX socket，否则走 TCP"""
+        if cls.MYSQL_UNIX_SOCKET and os.path.exists(cls.MYSQL_UNIX_SOCKET):
+            return (f"{scheme}://{cls.MYSQL_USER}:{cls.MYSQL_PASSWORD}@/{cls.MYSQL_DATABASE}"
+                    f"?unix_socket={cls.MYSQL_UNIX_SOCKET}&charset={cls.MYSQL_CHARSET}")
+        return (f"{scheme}://{cls.MYSQL_USER}:{cls.MYSQL_PASSWORD}@{cls.MYSQL_HOST}:{cls.MYSQL_PORT}/{cls.MYSQL_DATABASE}"
+                f"?charset={cls.MYSQL_CHARSET}")
+    
+    @classmethod
+    @functools.lru_cache(maxsize=None)
     def get_mysql_uri(cls):
         """获取 MySQL SQLAlchemy 连接字符串"""
-        return f"mysql+pymysql://{cls.MYSQL_USER}:{cls.MYSQL_PASSWORD}@{cls.MYSQL_HOST}:{cls.MYSQL_PORT}/{cls.MYSQL_DATABASE}"
+        return cls._build_mysql_uri("mysql+mysqldb")
     
     @classmethod
+    @functools.lru_cache(maxsize=None)
     def get_mysql_celery_uri(cls):
         """获取 MySQL Celery 结果后端连接字符串"""
-        return f"db+mysql+pymysql://{cls.MYSQL_USER}:{cls.MYSQL_PASSWORD}@{cls.MYSQL_HOST}:{cls.MYSQL_PORT}/{cls.MYSQL_DATABASE}"
+        return cls._build_mysql_uri("db+mysql+mysqldb")
     
     @classmethod
-    def get_redis_uri(cls):
-        """获取 Redis 连接字符串"""
+    def _build_redis_uri(cls, db):
         if cls.REDIS_PASSWORD:
-            return f"redis://:{cls.REDIS_PASSWORD}@{cls.REDIS_HOST}:{cls.REDIS_PORT}/{cls.REDIS_DB}"
+            return f"redis://:{cls.REDIS_PASSWORD}@{cls.REDIS_HOST}:{cls.REDIS_PORT}/{db}"
         else:
-            return f"redis://{cls.REDIS_HOST}:{cls.REDIS_PORT}/{cls.REDIS_DB}"
+            return f"redis://{cls.REDIS_HOST}:{cls.REDIS_PORT}/{db}"
+    
+    @classmethod
+    @functools.lru_cache(maxsize=None)
+    def get_redis_uri(cls):
+        """获取 Redis 连接字符串"""
+        return cls._build_redis_uri(cls.REDIS_DB)
+    
+    @classmethod
+    @functools.lru_cache(maxsize=None)
+    def get_redis_result_uri(cls):
+        """获取 Celery Redis 结果后端连接字符串"""
+        return cls._build_redis_uri(cls.REDIS_RESULT_DB)
     
     @classmethod
     def get_mysql_config_dict(cls):
@@ -82,11 +124,28 @@ class BaseConfig:
             'db': cls.REDIS_DB,
             'decode_responses': cls.REDIS_DECODE_RESPONSES,
             'max_connections': cls.REDIS_POOL_MAX_CONNECTIONS,
-            'retry_on_timeout': cls.REDIS_POOL_RETRY_ON_TIMEOUT
+            'retry_on_timeout': cls.REDIS_POOL_RETRY_ON_TIMEOUT,
+            'socket_timeout': cls.REDIS_SOCKET_TIMEOUT,
+            'socket_connect_timeout': cls.REDIS_SOCKET_CONNECT_TIMEOUT,
+            'socket_keepalive': cls.REDIS_SOCKET_KEEPALIVE,
+            'health_check_interval': cls.REDIS_HEALTH_CHECK_INTERVAL,
         }
         if cls.REDIS_PASSWORD:
             config['password'] = cls.REDIS_PASSWORD
         return config
+    
+    @classmethod
+    def get_celery_broker_transport_options(cls):
+        """获取 Celery Redis broker 的传输参数"""
+        return {
+            'visibility_timeout': 3600,
+            'max_connections': cls.REDIS_POOL_MAX_CONNECTIONS,
+            'socket_timeout': cls.REDIS_SOCKET_TIMEOUT,
+            'socket_connect_timeout': cls.REDIS_SOCKET_CONNECT_TIMEOUT,
+            'socket_keepalive': cls.REDIS_SOCKET_KEEPALIVE,
+            'retry_on_timeout': cls.REDIS_POOL_RETRY_ON_TIMEOUT,
+            'health_check_interval': cls.REDIS_HEALTH_CHECK_INTERVAL,
+        }
 
 
 class DevelopmentConfig(BaseConfig):
@@ -109,6 +168,7 @@ class TestConfig(BaseConfig):
     DEBUG = True
     MYSQL_DATABASE = 't11_test'  # 测试数据库
     REDIS_DB = 1  # 测试用的Redis数据库
+    REDIS_RESULT_DB = 3  # 测试用的 Celery 结果后端数据库
 
 
 # ============ 配置选择 ============
@@ -127,14 +187,18 @@ def get_config():
 # ============ 导出当前配置 ============
 Config = get_config()
 
+# 连接字符串在导入时计算一次
+MYSQL_URI = Config.get_mysql_uri()
+REDIS_URI = Config.get_redis_uri()
+
 # ============ 便捷访问方法 ============
 def get_mysql_uri():
     """便捷方法：获取MySQL连接字符串"""
-    return Config.get_mysql_uri()
+    return MYSQL_URI
 
 def get_redis_uri():
     """便捷方法：获取Redis连接字符串"""
-    return Config.get_redis_uri()
+    return REDIS_URI
 
 def get_mysql_config():
     """便捷方法：获取MySQL配置字典"""
@@ -1,64 +1,280 @@
-# db连接池 dbutils
-import socket
-from dbutils.pooled_db import PooledDB
-import pymysql
+# db连接池 统一使用 SQLAlchemy 引擎的连接池
+import functools
+import hashlib
+import os
+import re
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+import MySQLdb
+import msgpack
+import redis
+from redis.backoff import ExponentialBackoff
+from redis.retry import Retry
+from flask import g, has_request_context
+from sqlalchemy import create_engine
 from .app_config import Config
 
-# 从统一配置文件获取数据库配置
+# 从统一配置文件获取数据库配置（charset 与 unix_socket 已包含在连接字符串中）
 db_config = Config.get_mysql_config_dict()
 
-pool = PooledDB(
-    #列出pooledb常用的参数，并给出相应的中文注释
-    creator=pymysql,  # 数据库连接模块
-    maxconnections=Config.MYSQL_POOL_MAX_CONNECTIONS,  # 最大连接数
-    mincached=Config.MYSQL_POOL_MIN_CACHED,  # 初始化时，链接池中至少创建的空闲的链接，0表示不创建
-    blocking=Config.MYSQL_POOL_BLOCKING,  # 连接池中如果没有可用连接后，是否阻塞等待。True，等待；False，不等待然后报错
-    maxcached=Config.MYSQL_POOL_MAX_CACHED,  # 最大空闲连接数
-    maxshared=Config.MYSQL_POOL_MAX_SHARED,  # 共享连接数
-    setsession=[],  # 开始会话前执行的命令列表。如：["set datestyle to ...", "set time zone ..."]
-    ping=Config.MYSQL_POOL_PING,  # 连接的ping值
-    host=db_config['host'],
-    port=db_config['port'],
-    user=db_config['user'],
-    password=db_config['password'],
-    database=db_config['database'],
-    charset=db_config['charset'],
-    unix_socket=db_config['unix_socket']
-)
+@functools.lru_cache(maxsize=1)
+def _engine():
+    """
+    首次使用时才创建引擎和连接池，导入本模块不会触发任何数据库连接
+    """
+    return create_engine(
+        Config.get_mysql_uri(),
+        pool_size=Config.MYSQL_POOL_MAX_CONNECTIONS,  # 连接池常驻连接数
+        max_overflow=Config.MYSQL_POOL_MAX_OVERFLOW,  # 超出 pool_size 后允许临时创建的连接数，-1 表示不限制
+        pool_timeout=Config.MYSQL_POOL_TIMEOUT,  # 连接池用满时阻塞等待的超时时间
+        pool_use_lifo=True,  # 后进先出：同一线程反复取到刚归还的热连接，多余的空闲连接自然老化回收
+        pool_pre_ping=True,  # 取出连接前先 ping，自动剔除失效连接
+        pool_recycle=Config.MYSQL_POOL_RECYCLE,  # 连接最长存活时间（秒），避免被 MySQL wait_timeout 断开
+    )
+
+def _reset_pool_after_fork():
+    # fork 出的子进程（gunicorn/Celery worker）不能复用父进程的连接，换一个新的连接池
+    if _engine.cache_info().currsize:
+        _engine().dispose(close=False)
+
+os.register_at_fork(after_in_child=_reset_pool_after_fork)
 
 def get_conn():
-    conn = pool.connection()
+    # raw_connection 返回池化的 DBAPI 连接，保留 DB-API 的 %s 占位符和 DictCursor 用法
+    conn = _engine().raw_connection()
     return conn
 
-def dml_sql(sql, parameters=None):
-    conn = get_conn()
-    cursor = conn.cursor()
-    if parameters:
-        cursor.execute(sql, parameters)
-    else:
-        cursor.execute(sql)
-    conn.commit()
-    affected_rows = cursor.rowcount
-    cursor.close()
-    conn.close()
-    return affected_rows
+def _get_request_conn():
+    """
+    在 Flask 请求内复用同一个连接：首次使用时从连接池获取并挂到 g 上，
+    请求结束时由 release_request_conn 归还。非请求上下文（Celery 任务、脚本）返回 None
+    """
+    if not has_request_context():
+        return None
+    conn = g.get('_db_conn')
+    if conn is None:
+        conn = g._db_conn = get_conn()
+    return conn
 
-def query_sql(sql, params=None):
+def release_request_conn(exc=None):
     """
-    执行查询语句，返回字典列表
+    teardown_request 钩子：归还当前请求占用的连接
     """
+    close_db_connection(g.pop('_db_conn', None))
+
+_scoped = threading.local()
+
+@contextmanager
+def connection_scope():
+    """
+    在当前线程内复用同一个连接：作用域内的 fetch_one/fetch_all/dml_sql 等都使用这个连接，退出时归还。
+    用于请求上下文之外连续执行大量小查询的场景（如线程池中的批处理任务），嵌套使用时复用外层连接
+    """
+    if getattr(_scoped, 'conn', None) is not None:
+        yield _scoped.conn
+        return
+    conn = _scoped.conn = get_conn()
+    try:
+        yield conn
+    finally:
+        _scoped.conn = None
+        close_db_connection(conn)
+
+@contextmanager
+def _connection():
+    conn = getattr(_scoped, 'conn', None) or _get_request_conn()
+    if conn is not None:
+        yield conn
+        return
     conn = get_conn()
-    cursor = conn.cursor(pymysql.cursors.DictCursor) # 使用 DictCursor 让结果以字典形式返回
     try:
-        cursor.execute(sql, params or ())
-        result = cursor.fetchall()
-        return result
-    except Exception as e:
-        print(f"查询出错: {e}")
-        return []
+        yield conn
     finally:
+        close_db_connection(conn)
+
+# ============ Redis 连接池 ============
+def make_redis_pool(decode_responses=None):
+    """
+    应用侧 Redis 连接池：带超时、保活和指数退避重试
+    连接数达到 REDIS_POOL_MAX_CONNECTIONS 时阻塞等待（最多 REDIS_POOL_TIMEOUT 秒），而不是继续新建连接
+    """
+    config = Config.get_redis_config_dict()
+    if decode_responses is not None:
+        config['decode_responses'] = decode_responses
+    return redis.BlockingConnectionPool(
+        **config,
+        timeout=Config.REDIS_POOL_TIMEOUT,
+        retry=Retry(ExponentialBackoff(), Config.REDIS_RETRY_ATTEMPTS),
+    )
+
+# ============ 查询结果缓存（Redis） ============
+# 二进制数据（msgpack 查询缓存、Flask-Caching 的 pickle 数据）共用的客户端，
+# 不能使用 decode_responses=True 的连接；文本数据使用 extensions.redis_client
+cache_client = redis.Redis(connection_pool=make_redis_pool(decode_responses=False))
+
+# 用于从 SQL 中提取涉及的表名，作为缓存失效的标签
+_TABLE_RE = re.compile(r'\b(?:from|join|into|update)\s+`?(\w+)`?', re.IGNORECASE)
+# 结果随时间变化或带锁的查询不缓存
+_UNCACHEABLE_RE = re.compile(r'\bfor\s+update\b|\bnow\s*\(|\brand\s*\(|\blast_insert_id\s*\(', re.IGNORECASE)
+
+
+# msgpack 扩展类型：保证 datetime/date/Decimal/TIME 列经缓存后类型不变
+_EXT_DATETIME = 1
+_EXT_DATE = 2
+_EXT_DECIMAL = 3
+_EXT_TIMEDELTA = 4
+
+
+def _pack_default(obj):
+    if isinstance(obj, datetime):
+        return msgpack.ExtType(_EXT_DATETIME, obj.isoformat().encode())
+    if isinstance(obj, date):
+        return msgpack.ExtType(_EXT_DATE, obj.isoformat().encode())
+    if isinstance(obj, Decimal):
+        return msgpack.ExtType(_EXT_DECIMAL, str(obj).encode())
+    if isinstance(obj, timedelta):
+        return msgpack.ExtType(_EXT_TIMEDELTA, repr(obj.total_seconds()).encode())
+    raise TypeError(f"无法缓存的类型: {type(obj)!r}")
+
+
+def _unpack_ext(code, data):
+    text = data.decode()
+    if code == _EXT_DATETIME:
+        return datetime.fromisoformat(text)
+    if code == _EXT_DATE:
+        return date.fromisoformat(text)
+    if code == _EXT_DECIMAL:
+        return Decimal(text)
+    if code == _EXT_TIMEDELTA:
+        return timedelta(seconds=float(text))
+    return msgpack.ExtType(code, data)
+
+
+def _dumps(result):
+    return msgpack.packb(result, default=_pack_default, use_bin_type=True)
+
+
+def _loads(blob):
+    # use_list=False：fetchall 返回的元组经缓存后仍是元组
+    return msgpack.unpackb(blob, ext_hook=_unpack_ext, raw=False, use_list=False)
+
+
+def _sql_tables(sql):
+    return {m.group(1).lower() for m in _TABLE_RE.finditer(sql)}
+
+
+def invalidate_table(table):
+    """
+    删除与指定表相关的全部查询缓存
+    """
+    tag_key = f'sqltag:{table}'
+    try:
+        keys = cache_client.smembers(tag_key)
+        cache_client.delete(tag_key, *keys)
+    except Exception as e:
+        print(f"清除查询缓存出错: {e}")
+
+
+def _invalidate_for(sql):
+    for table in _sql_tables(sql):
+        invalidate_table(table)
+
+
+def sql_cache(ttl=None):
+    """
+    查询结果缓存装饰器：以 SQL+参数 的哈希为键，命中时直接返回 Redis 中的结果。
+    仅缓存 SELECT 语句，写操作通过 dml_sql 按表名失效；
+    序列化后超过 Config.SQL_CACHE_MAX_BYTES 的结果不写入缓存
+    """
+    ttl = ttl or Config.SQL_CACHE_TTL
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(sql, parameters=None):
+            stripped = sql.lstrip().lower()
+            tables = _sql_tables(sql)
+            if not stripped.startswith('select') or not tables or _UNCACHEABLE_RE.search(sql):
+                return func(sql, parameters)
+
+            digest = hashlib.blake2b((sql + repr(parameters)).encode(), digest_size=16).hexdigest()
+            key = f'sql:{func.__name__}:{digest}'
+            try:
+                cached = cache_client.get(key)
+                if cached is not None:
+                    return _loads(cached)
+            except Exception as e:
+                print(f"读取查询缓存出错: {e}")
+
+            result = func(sql, parameters)
+            try:
+                blob = _dumps(result)
+                if len(blob) <= Config.SQL_CACHE_MAX_BYTES:
+                    pipe = cache_client.pipeline()
+                    pipe.setex(key, ttl, blob)
+                    for table in tables:
+                        pipe.sadd(f'sqltag:{table}', key)
+                        pipe.expire(f'sqltag:{table}', ttl)
+                    pipe.execute()
+            except Exception as e:
+                print(f"写入查询缓存出错: {e}")
+            return result
+        return wrapper
+    return decorator
+
+def dml_sql(sql, parameters=None):
+    with _connection() as conn:
+        cursor = conn.cursor()
+        if parameters:
+            cursor.execute(sql, parameters)
+        else:
+            cursor.execute(sql)
+        conn.commit()
+        affected_rows = cursor.rowcount
         cursor.close()
-        close_db_connection(conn) # 修正：这里需要传入当前连接
+    _invalidate_for(sql)
+    return affected_rows
+
+def dml_many(sql, params_list, chunk=1000):
+    """
+    批量执行同一条 DML 语句，共用一个连接并在最后统一提交。
+    INSERT 语句需使用 VALUES (%s, ...) 形式，驱动会把每个分块改写为一条多行 INSERT。
+    """
+    params_list = list(params_list)
+    if not params_list:
+        return 0
+    with _connection() as conn:
+        cursor = conn.cursor()
+        try:
+            affected_rows = 0
+            for start in range(0, len(params_list), chunk):
+                cursor.executemany(sql, params_list[start:start + chunk])
+                affected_rows += cursor.rowcount
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+    _invalidate_for(sql)
+    return affected_rows
+
+def query_sql(sql, params=None):
+    """
+    执行查询语句，返回字典列表
+    """
+    with _connection() as conn:
+        cursor = conn.cursor(MySQLdb.cursors.DictCursor) # 使用 DictCursor 让结果以字典形式返回
+        try:
+            cursor.execute(sql, params or ())
+            result = cursor.fetchall()
+            return result
+        except Exception as e:
+            print(f"查询出错: {e}")
+            return []
+        finally:
+            cursor.close()
 
 def close_db_connection(conn=None):
     """
@@ -71,45 +287,79 @@ def close_db_connection(conn=None):
             print(f"归还连接池出错: {e}")
 
 def fetch_one(sql, parameters=None):
-    conn = get_conn()
-    cursor = conn.cursor(pymysql.cursors.DictCursor)
-    if parameters:
-        cursor.execute(sql, parameters)
-    else:
-        cursor.execute(sql)
-    result = cursor.fetchone()
-    cursor.close()
-    conn.close()
+    with _connection() as conn:
+        cursor = conn.cursor(MySQLdb.cursors.DictCursor)
+        if parameters:
+            cursor.execute(sql, parameters)
+        else:
+            cursor.execute(sql)
+        result = cursor.fetchone()
+        cursor.close()
     return result
 
 def fetch_all(sql, parameters=None):
-    conn = get_conn()
-    cursor = conn.cursor(pymysql.cursors.DictCursor)
-    if parameters:
-        cursor.execute(sql, parameters)
-    else:
-        cursor.execute(sql)
-    result = cursor.fetchall()
-    cursor.close()
-    conn.close()
+    with _connection() as conn:
+        cursor = conn.cursor(MySQLdb.cursors.DictCursor)
+        if parameters:
+            cursor.execute(sql, parameters)
+        else:
+            cursor.execute(sql)
+        result = cursor.fetchall()
+        cursor.close()
     return result
 
-def dml_sql_with_insert_id(sql, params=None):
+@sql_cache()
+def fetch_one_cached(sql, parameters=None):
     """
-    执行插入语句，并返回新产生的自增 ID
+    同 fetch_one，结果缓存在 Redis 中。只用于少量高频、结果较小的查询（如文档列表），
+    且相关表的写入都要经过 dml_sql/dml_many/dml_sql_with_insert_id，否则缓存最多滞后 SQL_CACHE_TTL 秒
+    """
+    return fetch_one(sql, parameters)
+
+@sql_cache()
+def fetch_all_cached(sql, parameters=None):
+    """
+    同 fetch_all，结果缓存在 Redis 中，适用范围同 fetch_one_cached
+    """
+    return fetch_all(sql, parameters)
+
+def iter_rows(sql, parameters=None, chunk=500):
+    """
+    使用服务端游标流式读取查询结果，按 chunk 分批拉取并逐行产出字典，
+    适合结果集很大的查询。迭代期间独占一个连接（不使用请求内共享连接），迭代结束后归还
     """
     conn = get_conn()
-    cursor = conn.cursor()
+    cursor = conn.cursor(MySQLdb.cursors.SSDictCursor)
     try:
-        cursor.execute(sql, params or ())
-        conn.commit()
-        last_id = cursor.lastrowid # 获取自增 ID
-        affected_rows = cursor.rowcount
-        return last_id, affected_rows
-    except Exception as e:
-        conn.rollback()
-        print(f"执行带ID插入出错: {e}")
-        return None, 0
+        if parameters:
+            cursor.execute(sql, parameters)
+        else:
+            cursor.execute(sql)
+        while True:
+            rows = cursor.fetchmany(chunk)
+            if not rows:
+                break
+            yield from rows
     finally:
         cursor.close()
-        close_db_connection(conn)
\ No newline at end of file
+        close_db_connection(conn)
+
+def dml_sql_with_insert_id(sql, params=None):
+    """
+    执行插入语句，并返回新产生的自增 ID
+    """
+    with _connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(sql, params or ())
+            conn.commit()
+            last_id = cursor.lastrowid # 获取自增 ID
+            affected_rows = cursor.rowcount
+            _invalidate_for(sql)
+            return last_id, affected_rows
+        except Exception as e:
+            conn.rollback()
+            print(f"执行带ID插入出错: {e}")
+            return None, 0
+        finally:
+            cursor.close()
\ No newline at end of file
@@ -2,10 +2,18 @@
 import logging
 import sys
 from loguru import logger
+from .app_config import Config
+
+# 所有 sink 中的最低级别（文件 sink 为 DEBUG），低于该级别的标准日志无需转发
+_MIN_SINK_LEVEL = logging.DEBUG
 
 # 1. 定义拦截器：将标准 logging 的日志转发到 loguru
 class InterceptHandler(logging.Handler):
     def emit(self, record):
+        # 低于所有 sink 最低级别的日志直接丢弃，省去栈帧回溯和消息格式化
+        if record.levelno < _MIN_SINK_LEVEL:
+            return
+
         # 获取对应的 Loguru level
         try:
             level = logger.level(record.levelname).name
@@ -36,19 +44,20 @@ def setup_logging():
 
     # --- 配置输出目标 (Sink) ---
     
-    # A. 输出到控制台 (Console)
-    logger.add(
-        sys.stderr,
-        level="INFO",
-        format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>"
-    )
+    # A. 输出到控制台 (Console) - 仅开发调试时启用，生产环境只写文件
+    if Config.DEBUG:
+        logger.add(
+            sys.stderr,
+            level="INFO",
+            format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>"
+        )
 
     # B. 输出到文件 (File) - 每天轮转，保留 10 天
     logger.add(
         "./file_process/logs/app_{time:YYYY-MM-DD}.log",  # 日志文件路径
         rotation="00:00",                   # 每天 0 点创建新文件
         retention="10 days",                # 保留最近 10 天的日志
-        level="DEBUG",                      # 文件记录更详细的 DEBUG 级别
+        level=_MIN_SINK_LEVEL,              # 文件记录更详细的 DEBUG 级别
         encoding="utf-8",
         enqueue=True                        # 异步写入，线程安全
     )
@@ -56,7 +65,7 @@ def setup_logging():
     # --- 接管标准日志 ---
     
     # 获取 Python 标准 logging 的 root logger
-    logging.basicConfig(handlers=[InterceptHandler()], level=0, force=True)
+    logging.basicConfig(handlers=[InterceptHandler()], level=_MIN_SINK_LEVEL, force=True)
 
     # 特别处理：让 Flask 和 Werkzeug (HTTP服务器) 的日志也走 Loguru
     for logger_name in ("werkzeug", "flask.app", "gunicorn", "gunicorn.access", "gunicorn.error"):
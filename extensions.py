@@ -1,6 +1,15 @@
+import redis
 from flask_sqlalchemy import SQLAlchemy
+from flask_caching import Cache
 from celery import Celery
+from config.db_config import make_redis_pool
 
 # 这里只创建对象，不绑定 app
 db = SQLAlchemy()
-celery = Celery()
\ No newline at end of file
+cache = Cache()
+celery = Celery()
+
+# 应用侧共享的 Redis 连接池（文本数据，decode_responses=True）；
+# 二进制数据使用 config.db_config.cache_client，两者配置相同、各自封顶
+redis_pool = make_redis_pool()
+redis_client = redis.Redis(connection_pool=redis_pool)
\ No newline at end of file
@@ -1,32 +1,29 @@
-import os
-import sys
+import re
 from flask import Flask
 from .models.auth import au
 from .models.documents import docu
 from .models.fileprocess import docp
 #from .models.fileupload import upload_bp
 from flask import request,session,redirect
-from extensions import db, celery # 导入扩展
+from extensions import db, cache, celery # 导入扩展
 from config.logging_config import setup_logging, logger
-
-# 添加父目录到路径，以便导入统一配置
-sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 from config.app_config import Config
+from config.db_config import cache_client, release_request_conn
+
+# 无需登录即可访问的路径：'/'、'/register'、'/logout' 精确匹配，'/static'、'/images' 前缀匹配
+#auth_required也要将static目录排除掉，不然before_request会将里面的css样式都给禁用掉了
+_is_open_path = re.compile(r'(?:/|/register|/logout)\Z|/static|/images').match
 
 # 登录验证
 def auth_required():
-    #auth_required也要将static目录排除掉，不然before_request会将里面的css样式都给禁用掉了
-    if (request.path == '/' or 
-        request.path == '/register' or 
-        request.path.startswith('/static') or 
-        request.path.startswith('/images') or
-        request.path == '/logout'):
+    path = request.path
+    if _is_open_path(path):
         return
     
     user_info = session.get('user')
     if user_info is None:
         # 如果是 API 请求，返回 JSON 错误而不是重定向
-        if request.path.startswith('/api/'):
+        if path.startswith('/api/'):
             from flask import jsonify
             return jsonify({
                 'success': False,
@@ -40,30 +37,29 @@ def auth_required():
 def myapp():
     # 1. 在 app 创建前就初始化日志，确保能捕获启动过程的日志
     setup_logging()
-    # 获取项目根目录
-    basedir = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
-
     app = Flask(__name__)
-    # 使用绝对路径加载配置文件
-    app.config.from_pyfile(os.path.join(basedir, 'config', 'app_config.py'))
 
-# 1. 加载配置 - 使用统一配置
-    app.config['SECRET_KEY'] = Config.SECRET_KEY
-    app.config['DEBUG'] = Config.DEBUG
+# 1. 加载配置 - 使用统一配置（直接复制配置类的大写属性，SECRET_KEY、DEBUG 等）
+    app.config.from_object(Config)
     app.config['SQLALCHEMY_DATABASE_URI'] = Config.get_mysql_uri()
     app.config['CELERY_BROKER_URL'] = Config.get_redis_uri()
-    app.config['CELERY_RESULT_BACKEND'] = Config.get_mysql_celery_uri()
+    app.config['CELERY_RESULT_BACKEND'] = Config.get_redis_result_uri()
     # 优化 Celery Redis 连接池设置 (可选)
-    app.config['CELERY_BROKER_TRANSPORT_OPTIONS'] = {
-        'visibility_timeout': 3600,
-        'max_connections': Config.REDIS_POOL_MAX_CONNECTIONS, # 使用统一配置
-    }
+    app.config['CELERY_BROKER_TRANSPORT_OPTIONS'] = Config.get_celery_broker_transport_options() # 使用统一配置
     # 添加上传所需的配置
     app.config['UPLOAD_FOLDER'] = 'uploads/temp'
     app.config['FINAL_FOLDER'] = 'uploads/final'
 
 # 2. 初始化扩展
     db.init_app(app)
+    # 用户查询等热点数据缓存到 Redis，减少 MySQL 往返
+    # CACHE_REDIS_HOST 传入现成的客户端时 Flask-Caching 直接复用，不再自建连接池
+    cache.init_app(app, config={
+        'CACHE_TYPE': 'RedisCache',
+        'CACHE_REDIS_HOST': cache_client,
+        'CACHE_KEY_PREFIX': 'fp_',
+        'CACHE_DEFAULT_TIMEOUT': 60,
+    })
     
     # 初始化 Celery
     # 【核心修改】初始化 Celery 配置
@@ -72,11 +68,9 @@ def myapp():
         broker_url=app.config['CELERY_BROKER_URL'],        # 映射到 broker_url
         result_backend=app.config['CELERY_RESULT_BACKEND'],# 映射到 result_backend
         broker_connection_retry_on_startup=True,           # 建议加上这个，防止启动警告
-        # 如果还有其他配置，比如连接池，也可以在这里加上
-        broker_transport_options = {
-            'visibility_timeout': 3600,
-            'max_connections': Config.REDIS_POOL_MAX_CONNECTIONS,
-        }
+        # 连接池、超时与保活设置，Redis 故障时任务提交不会无限挂起
+        broker_transport_options=app.config['CELERY_BROKER_TRANSPORT_OPTIONS'],
+        broker_pool_limit=Config.REDIS_POOL_MAX_CONNECTIONS,
     )
     # 在 celery 配置完成后再导入 upload_bp
     from .models.fileupload import upload_bp  # ← 添加到这里
@@ -93,14 +87,15 @@ def myapp():
     app.register_blueprint(chatdoc)
     app.register_blueprint(llm_bp)  # 注册LLM功能蓝图 
     app.before_request(auth_required)
+    # 请求内复用的数据库连接在请求结束时归还连接池
+    app.teardown_request(release_request_conn)
 
-    # 应用启动时恢复孤儿任务
-    try:
-        with app.app_context():
-            recover_orphaned_tasks()
-            logger.info("应用启动时任务恢复检查完成")
-    except Exception as e:
-        logger.error(f"应用启动时任务恢复失败: {e}")
+    # 孤儿任务恢复由 Celery worker 启动时执行；仅部署 Web 服务时可手动运行 flask recover-tasks
+    @app.cli.command('recover-tasks')
+    def recover_tasks_command():
+        """恢复超时未完成的文档处理任务"""
+        recover_orphaned_tasks()
+        logger.info("任务恢复检查完成")
 
     return app
 
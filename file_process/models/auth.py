@@ -1,9 +1,39 @@
+import hmac
+import re
+import bcrypt
 from flask import Blueprint,request,redirect,render_template,url_for,flash,session
 from config.db_config import fetch_one,fetch_all,dml_sql
+from extensions import cache
 
 
 au=Blueprint('au',__name__)
 
+# 完整的 bcrypt 哈希格式：$2a$/$2b$/$2y$ + 两位 cost + 53 位 salt 和哈希；仅以 $2 开头的历史明文密码不能当作哈希
+_BCRYPT_HASH_RE = re.compile(r'^\$2[aby]\$\d\d\$[./A-Za-z0-9]{53}$')
+
+
+@cache.memoize(timeout=60)
+def get_user(username):
+    """按用户名查询用户（走 username 唯一索引，结果缓存在 Redis 中，60 秒过期）"""
+    return fetch_one('select id, username, password from user where username=%s', (username,))
+
+
+def hash_password(password):
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(12)).decode()
+
+
+def check_password(user, password):
+    """校验密码；历史明文密码校验通过后就地升级为 bcrypt 哈希"""
+    stored = user['password'] or ''
+    if _BCRYPT_HASH_RE.match(stored):
+        return bcrypt.checkpw(password.encode(), stored.encode())
+    if not hmac.compare_digest(stored.encode(), password.encode()):
+        return False
+    dml_sql('update user set password=%s where id=%s', (hash_password(password), user['id']))
+    cache.delete_memoized(get_user, user['username'])
+    return True
+
+
 @au.route('/',methods=['GET','POST'])
 def index():
     if request.method == 'POST':
@@ -12,11 +42,12 @@ def index():
         if not username or not password:
             flash(message='用户名和密码不能为空')
             return render_template(template_name_or_list='index.html')
-        user = fetch_one('select * from user where username=%s and password=%s', (username, password))
-        if not user:
+        user = get_user(username)
+        if not user or not check_password(user, password):
             flash('用户名或密码错误')
             return render_template(template_name_or_list='index.html')
-        session['user'] = user
+        # session 中不保存密码哈希
+        session['user'] = {'id': user['id'], 'username': user['username']}
         return redirect('/documentlist')
     return render_template('index.html')
 
@@ -30,10 +61,11 @@ def register():
         if not username or not password:
             flash(message='用户名和密码不能为空')
             return render_template(template_name_or_list='register.html')
-        if fetch_one('select * from user where username=%s', (username,)):
+        if get_user(username):
             flash('用户名已存在')
             return redirect(url_for('au.register'))
-        dml_sql('insert into user(username,password) values(%s,%s)', (username, password))
+        dml_sql('insert into user(username,password) values(%s,%s)', (username, hash_password(password)))
+        cache.delete_memoized(get_user, username)
         # 注册成功后重定向到首页
         return redirect('/')
     return render_template('register.html')
@@ -42,5 +74,8 @@ def register():
 @au.route('/logout', methods=['GET', 'POST'])
 def logout():
     """用户退出登录"""
+    user_info = session.get('user')
     session.clear()
+    if user_info:
+        cache.delete_memoized(get_user, user_info.get('username'))
     return redirect('/')
\ No newline at end of file
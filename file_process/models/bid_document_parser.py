@@ -11,38 +11,457 @@ Phase 5: Word结果文档生成
 import os
 import re
 import json
-import tempfile
+import copy
+import functools
+import io
+import threading
+import time
+import uuid
+import zipfile
+from collections import Counter, OrderedDict, defaultdict
 from datetime import datetime
 from typing import Dict, List, Optional, Tuple, Any
 from docx import Document as DocumentLoader
+from docx.api import _default_docx_path
 from docx.document import Document as DocxDocument
+from docx.opc.packuri import PackURI
+from docx.opc.part import Part
+from docx.opc.pkgwriter import PackageWriter
 from docx.table import Table, _Cell
 from docx.text.paragraph import Paragraph
-from docx.oxml.ns import qn
+from docx.oxml import OxmlElement
+from docx.oxml.ns import nsmap, qn
 from docx.shared import Inches, Pt, RGBColor
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from difflib import SequenceMatcher
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from lxml import etree
+from rapidfuzz.distance import LCSseq
 
+from config.app_config import Config
 from config.logging_config import logger
-from config.db_config import fetch_one, fetch_all
+from config.db_config import connection_scope, fetch_one, fetch_one_cached, fetch_all
+from celery import chord, group
+from .celery_app import celery
+
+
+# 需求项（编号列表）正则：1. / (1) / ① / 项目符号
+_REQUIREMENT_ITEM_PATTERNS = (
+    re.compile(r'^(\d+)[\.、\)]\s*(.+)'),  # 1. 或 1、或 1)
+    re.compile(r'^\((\d+)\)\s*(.+)'),      # (1)
+    re.compile(r'^([①②③④⑤⑥⑦⑧⑨⑩])\s*(.+)'),  # 圆圈数字
+    re.compile(r'^[•·]\s*(.+)'),            # 项目符号
+)
+# 需求项可能的首字符（数字之外）：首字符不在其中且不是数字时不可能命中上面的正则
+_REQUIREMENT_ITEM_FIRST_CHARS = frozenset('(①②③④⑤⑥⑦⑧⑨⑩•·')
+
+# 章节内容中的需求项正则（比 _REQUIREMENT_ITEM_PATTERNS 多支持 ⑪-⑮、更多项目符号和中文括号）
+# 各分支合并为一个正则按顺序尝试，命名分组区分编号与正文，每个分支的最后一个分组都是正文
+_CONTENT_REQUIREMENT_PATTERN = re.compile(
+    r'(?:'
+    r'(?P<num>\d+)[\.、\)]\s*(?P<num_t>.+)'              # 1. 或 1、或 1)
+    r'|\((?P<paren>\d+)\)\s*(?P<paren_t>.+)'              # (1)
+    r'|(?P<circ>[①②③④⑤⑥⑦⑧⑨⑩⑪⑫⑬⑭⑮])\s*(?P<circ_t>.+)'  # 圆圈数字
+    r'|[•·▪➢►]\s*(?P<bul_t>.+)'                            # 项目符号
+    r'|[（\(](?P<cn_paren>\d+)[）\)]\s*(?P<cn_paren_t>.+)'  # 中文括号
+    r')'
+)
+_CONTENT_REQUIREMENT_FIRST_CHARS = frozenset('(（①②③④⑤⑥⑦⑧⑨⑩⑪⑫⑬⑭⑮•·▪➢►')
+# 圆圈数字 -> 序号
+_CIRCLED_NUMBERS = {ch: i for i, ch in enumerate('①②③④⑤⑥⑦⑧⑨⑩⑪⑫⑬⑭⑮', start=1)}
+
+# 标题样式名："Heading X" / "标题 X" / "Title X"
+_HEADING_STYLE_PATTERN = re.compile(r'^(?:Heading|标题|Title)\s*(\d+)$', re.IGNORECASE)
+
+# 需求表格的列识别：序号列表头、要求/规格列关键词（按优先级排列）、列为空时的备选表头
+_INDEX_HEADERS = frozenset({'序号', '编号', '项', 'No', 'No.', '#'})
+_REQUIREMENT_HEADER_KEYWORDS = ('技术要求', '功能要求', '要求', '功能', '项目', '名称', '技术项')
+_SPEC_HEADER_KEYWORDS = ('技术规格', '规格', '规格要求', '参数', '参数值', '技术参数', '指标', '指标要求')
+_REQUIREMENT_FALLBACK_HEADERS = ('技术要求', '功能要求', '要求', '功能', '项目')
+_SPEC_FALLBACK_HEADERS = ('技术规格', '规格', '规格要求', '参数', '参数值')
+# 单元格中的换行箭头符号：序号中直接去掉，文本中 ↵ 还原为换行
+_INDEX_CELL_TRANSLATION = str.maketrans({'↵': None, '←': None})
+_TEXT_CELL_TRANSLATION = str.maketrans({'↵': '\n', '←': None})
+
+
+def _keyword_rank(header: str, keywords: Tuple[str, ...]) -> Optional[int]:
+    """返回表头命中的优先级最高的关键词序号，未命中返回 None"""
+    for rank, keyword in enumerate(keywords):
+        if keyword in header:
+            return rank
+    return None
+
+
+# 文档流中的块级元素标签 -> python-docx 包装类
+_BLOCK_CTORS = {qn('w:p'): Paragraph, qn('w:tbl'): Table}
+
+# 段落大纲级别 <w:pPr><w:outlineLvl w:val="N"/>，预编译的 XPath 一次取出 val
+_OUTLINE_LEVEL_XPATH = etree.XPath('./w:pPr/w:outlineLvl/@w:val', namespaces={'w': nsmap['w']})
+
+# 段落（含超链接）中各 run 的文本类子元素，按文档顺序一次取出
+_PARAGRAPH_TEXT_XPATH = etree.XPath(
+    '(./w:r | ./w:hyperlink/w:r)'
+    '/*[self::w:br or self::w:cr or self::w:noBreakHyphen or self::w:ptab or self::w:t or self::w:tab]',
+    namespaces={'w': nsmap['w']},
+)
+
+
+def _paragraph_text(p) -> str:
+    """
+    获取 <w:p> 元素的文本，结果与 Paragraph.text 相同
+    
+    用一次预编译 XPath 取代 Paragraph.text 逐个 run / 超链接的 xpath 调用；
+    各元素转换成的文本（制表符、换行等）由 python-docx 的元素类定义
+    """
+    return ''.join(str(e) for e in _PARAGRAPH_TEXT_XPATH(p))
+
+
+# 有大纲级别的段落中以多级编号开头的标题，如 "1.2 xxx"
+_OUTLINE_NUMBERED_TITLE_RE = re.compile(r'^(\d+\.\d+(?:\.\d+)*)\s*(.+)')
+_DIGITS_RE = re.compile(r"(\d+)")
+
+# 用户指令中的章节编号与文档名
+_SECTION_NUMBER_RE = re.compile(r'\d+(?:\.\d+)+')
+_DOCUMENT_NAME_RE = re.compile(r'["""]([^"""]+)["""]|文档[《]([^》]+)[》]')
+
+# 数据库章节内容中以 1. / 1、/ 1) / (1) 开头的需求行，在整段内容上逐行匹配；
+# 行首尾空白不计入（[^\S\n] 为不含换行的空白），与逐行 strip 后匹配的结果一致
+_STORED_REQUIREMENT_RE = re.compile(
+    r'^[^\S\n]*(?:(\d+)[\.、\)]|\((\d+)\))[^\S\n]*(\S.*?)[^\S\n]*$',
+    re.MULTILINE,
+)
+_STORED_TABLE_RE = re.compile(r'\[表格\](.*?)\[/表格\]', re.DOTALL)
+
+# 作答匹配：关键词、文本清理、LLM 返回的 JSON、内容中的图片占位符 {{IMAGE_ID_xxx}}
+_WORD_RE = re.compile(r'[\u4e00-\u9fa5a-zA-Z0-9]+')
+_KEYWORD_STOPWORDS = frozenset({
+    '的', '是', '在', '有', '和', '与', '了', '这', '那', '什么',
+    '怎么', '如何', '为什么', '需要', '要求', '功能', '支持', '应',
+    '能', '可以', '进行', '具有', '提供', '包括', '等', '及',
+})
+_NON_WORD_CHAR_RE = re.compile(r'[^\u4e00-\u9fa5a-zA-Z0-9]')
+_JSON_OBJECT_RE = re.compile(r'\{[^}]+\}', re.DOTALL)
+_IMAGE_ID_RE = re.compile(r'\{\{IMAGE_ID_(\d+)\}\}')
+
+
+# 导出 Word 时匹配方式的显示名称（表格格式中处理失败显示为"失败"）
+_MATCH_LABELS = {
+    'exact': '精确匹配',
+    'semantic': '语义匹配',
+    'web': '网络搜索',
+    'llm_generated': 'LLM生成',
+    'none': '未匹配',
+    'error': '处理失败',
+}
+_MATCH_LABELS_TABLE = {**_MATCH_LABELS, 'error': '失败'}
+
+# 导出 Word 时【匹配方式】标签的颜色、【来源】标签的字号
+_MATCH_LABEL_COLOR = RGBColor(102, 126, 234)
+_SOURCE_LABEL_SIZE = Pt(10)
+
+# 节属性 <w:sectPr> 必须是 <w:body> 的最后一个子元素
+_SECT_PR_TAG = qn('w:sectPr')
+
+# 表格格式导出的表头
+_ANSWER_TABLE_HEADERS = ('序号', '技术要求', '应答内容', '匹配方式')
+
+
+def _table_cell_templates(tbl) -> List[Any]:
+    """按表格各列宽度生成空单元格 <w:tc> 模板（与 Table.add_row() 新建的单元格一致）"""
+    templates = []
+    for grid_col in tbl.tblGrid.gridCol_lst:
+        tc = OxmlElement('w:tc')
+        if grid_col.w is not None:
+            tc.width = grid_col.w
+        templates.append(tc)
+    return templates
+
+
+def _make_table_row(tc_templates: List[Any], texts: Tuple[str, ...], bold: bool = False):
+    """由单元格模板和各列文本拼装一行 <w:tr>，单元格内容与 _Cell.text 赋值的结果相同；
+    bold 为 True 时直接写入 <w:rPr><w:b/></w:rPr>，等同于 run.bold = True"""
+    tr = OxmlElement('w:tr')
+    for tc_template, text in zip(tc_templates, texts):
+        tc = copy.deepcopy(tc_template)
+        p = OxmlElement('w:p')
+        r = OxmlElement('w:r')
+        if bold:
+            rPr = OxmlElement('w:rPr')
+            rPr.append(OxmlElement('w:b'))
+            r.append(rPr)
+        r.text = text
+        p.append(r)
+        tc.append(p)
+        tr.append(tc)
+    return tr
+
+
+@functools.lru_cache(maxsize=None)
+def _default_template_bytes() -> bytes:
+    """python-docx 默认模板的文件内容，进程内只读取一次"""
+    with open(_default_docx_path(), 'rb') as f:
+        return f.read()
+
+
+def _new_doc() -> DocxDocument:
+    """基于默认模板新建导出文档：从内存中的模板字节加载，省去每次导出都从磁盘打开模板"""
+    return DocumentLoader(io.BytesIO(_default_template_bytes()))
+
+
+def _append_to_body(body, element):
+    """
+    把段落等块级元素追加到 <w:body> 末尾（<w:sectPr> 之前）
+    
+    python-docx 的 add_p()/_insert_p() 每次都从头扫描 body 查找 <w:sectPr>，逐段生成大文档时整体为 O(n²)；
+    这里只检查最后一个子元素
+    """
+    last = next(body.iterchildren(reversed=True), None)
+    if last is not None and last.tag == _SECT_PR_TAG:
+        last.addprevious(element)
+    else:
+        body.append(element)
+    return element
+
+
+def _make_text_paragraph(text: str, style_id: Optional[str] = None):
+    """构建只含一个文本 run 的段落 <w:p>（未插入文档），与 add_paragraph(text, style) 生成的段落相同；
+    style_id 为段落样式的 ID（如 'Heading2'），不是样式名"""
+    p = OxmlElement('w:p')
+    if style_id is not None:
+        p.style = style_id
+    r = OxmlElement('w:r')
+    r.text = text
+    p.append(r)
+    return p
+
+
+def _add_labeled_paragraph(doc: DocxDocument, label: str, *texts: str,
+                           color: Optional[RGBColor] = None, size: Optional[Pt] = None) -> Paragraph:
+    """在文档末尾追加"加粗标签 + 正文"段落，直接在 <w:body> 上拼装 <w:p>/<w:r>
+    
+    结果与 add_paragraph() 后逐个 add_run()、再设置标签 run 的 bold/font.color.rgb/font.size 相同，
+    texts 中每段文本各占一个 run
+    """
+    p = _append_to_body(doc.element.body, OxmlElement('w:p'))
+    label_r = p.add_r()
+    rPr = label_r.get_or_add_rPr()
+    rPr.get_or_add_b()
+    if color is not None:
+        rPr.get_or_add_color().val = color
+    if size is not None:
+        rPr.sz_val = size
+    label_r.text = label
+    for text in texts:
+        p.add_r().text = text
+    return Paragraph(p, doc._body)
+
+
+def _export_filepath(filename: str) -> str:
+    """导出文档的保存路径：放在 Web 进程与 Celery worker 共享的导出目录中，加随机前缀避免同一秒导出的文件互相覆盖"""
+    os.makedirs(Config.BID_EXPORT_FOLDER, exist_ok=True)
+    _sweep_expired_exports()
+    return os.path.join(Config.BID_EXPORT_FOLDER, f"{uuid.uuid4().hex}_{filename}")
+
+
+def _sweep_expired_exports():
+    """删除导出目录中超过 Config.BID_EXPORT_RETENTION 秒仍未被下载的文档"""
+    deadline = time.time() - Config.BID_EXPORT_RETENTION
+    try:
+        with os.scandir(Config.BID_EXPORT_FOLDER) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.stat().st_mtime < deadline:
+                    remove_export_file(entry.path)
+    except OSError as e:
+        logger.warning(f"清理过期导出文件失败: {e}")
+
+
+def remove_export_file(filepath: str):
+    """删除已下载的导出文档，文件已被删除时忽略"""
+    try:
+        os.remove(filepath)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"删除导出文件失败: {filepath}, 错误: {e}")
+
+
+def _iter_answer_table_rows(tc_templates: List[Any], items: List[Dict]):
+    """逐条生成应答表格的数据行 <w:tr>（序号、技术要求、应答内容、匹配方式）"""
+    for item in items:
+        requirement = item.get('requirement', '')
+        if item.get('spec'):
+            requirement += f"\n规格: {item['spec']}"
+        
+        yield _make_table_row(tc_templates, (
+            str(item.get('requirement_index', '')),
+            requirement,
+            item.get('answer', ''),
+            _MATCH_LABELS_TABLE.get(item.get('match_type', 'none'), '未知'),
+        ))
+
+
+# _save_docx 依赖的 python-docx 内部接口（requirements.txt 中限定 python-docx<2）：
+# PackageWriter 的三个静态写出步骤只要求 phys_writer 提供 write(pack_uri, blob)；
+# Part.before_marshal() 和 PackURI.membername 是 python-docx 自己保存时使用的接口。
+# 任何一个缺失时退回 doc.save()
+_PACKAGE_WRITER_STEPS = ('_write_content_types_stream', '_write_pkg_rels', '_write_parts')
+_PACKAGE_INTERNALS_AVAILABLE = (
+    all(hasattr(PackageWriter, name) for name in _PACKAGE_WRITER_STEPS)
+    and hasattr(Part, 'before_marshal')
+    and hasattr(PackURI, 'membername')
+)
+# 占位注释：标记流式数据行在 document.xml 中的插入位置
+_STREAMED_ROWS_MARK_RE = re.compile(rb'<!--streamed-rows:(\d+)-->')
+
+
+class _ExportPackageWriter:
+    """
+    供 python-docx PackageWriter 使用的 zip 写入器（替代 PhysPkgWriter）
+    
+    - 按 Config.BID_EXPORT_COMPRESSLEVEL 压缩：导出文件下载一次即弃，低压缩级别明显省 CPU
+    - streamed_rows 非空时 word/document.xml 分段写出，各表格的数据行逐行生成、写完即丢弃
+    """
+    
+    def __init__(self, filepath: str, doc: DocxDocument, streamed_rows: Dict[Any, Any]):
+        self._zip = zipfile.ZipFile(filepath, 'w', zipfile.ZIP_DEFLATED,
+                                    compresslevel=Config.BID_EXPORT_COMPRESSLEVEL)
+        self._doc = doc
+        self._streamed_rows = streamed_rows
+    
+    def write(self, pack_uri, blob: bytes):
+        if self._streamed_rows and pack_uri == self._doc.part.partname:
+            with self._zip.open(pack_uri.membername, 'w', force_zip64=True) as stream:
+                self._write_document_xml(stream)
+        else:
+            self._zip.writestr(pack_uri.membername, blob)
+    
+    def close(self):
+        self._zip.close()
+    
+    def _write_document_xml(self, stream):
+        """
+        在每个流式表格末尾放一个占位注释，整棵文档树按 doc.save() 的方式序列化后在占位处切开，
+        依次写出各段和逐行生成的数据行
+        
+        单独序列化的 <w:tr> 会在自身重复声明根元素上的全部命名空间（约为 doc.save() 输出的 4 倍大小），
+        因此去掉其开始标签中与根元素相同的命名空间声明
+        """
+        root = self._doc.element
+        tables = list(self._streamed_rows)
+        marks = []
+        for i, tbl in enumerate(tables):
+            mark = etree.Comment(f'streamed-rows:{i}')
+            tbl.append(mark)
+            marks.append(mark)
+        try:
+            xml = etree.tostring(root, encoding='UTF-8', standalone=True)
+        finally:
+            for mark in marks:
+                mark.getparent().remove(mark)
+        
+        inherited_ns = re.compile(b'|'.join(
+            re.escape(f' xmlns:{prefix}="{uri}"'.encode()) if prefix else re.escape(f' xmlns="{uri}"'.encode())
+            for prefix, uri in root.nsmap.items()
+        ))
+        pieces = _STREAMED_ROWS_MARK_RE.split(xml)
+        # split 后偶数位为文档片段，奇数位为占位的表格序号
+        stream.write(pieces[0])
+        for i in range(1, len(pieces), 2):
+            for tr in self._streamed_rows[tables[int(pieces[i])]]:
+                head, _, rest = etree.tostring(tr, encoding='UTF-8').partition(b'>')
+                stream.write(inherited_ns.sub(b'', head))
+                stream.write(b'>')
+                stream.write(rest)
+            stream.write(pieces[i + 1])
+
+
+def _save_docx(doc: DocxDocument, filepath: str, streamed_rows: Optional[Dict[Any, Any]] = None):
+    """
+    保存导出文档，等同于 doc.save(filepath)，但使用导出配置的压缩级别
+    
+    streamed_rows 为 {<w:tbl>: 数据行生成器}：python-docx 会把整个文档树留在内存中，数千行的应答表格
+    会占用大量内存，因此表格只保留表头，数据行在写出 document.xml 时逐行生成
+    """
+    streamed_rows = streamed_rows or {}
+    if not _PACKAGE_INTERNALS_AVAILABLE:
+        for tbl, rows in streamed_rows.items():
+            tbl.extend(rows)
+        doc.save(filepath)
+        return
+    
+    package = doc.part.package
+    for part in package.parts:
+        part.before_marshal()
+    
+    writer = _ExportPackageWriter(filepath, doc, streamed_rows)
+    try:
+        PackageWriter._write_content_types_stream(writer, package.parts)
+        PackageWriter._write_pkg_rels(writer, package.rels)
+        PackageWriter._write_parts(writer, package.parts)
+    finally:
+        writer.close()
+
+
+def _section_sort_key(section_number: str) -> Tuple[Tuple[int, str], ...]:
+    """章节号排序键：逐段按数字比较，非数字段（如"其他"）统一记为 -1 并按原文排在数字段之前，
+    避免 int 与 str 混合比较时抛出 TypeError"""
+    return tuple((int(p), '') if p.isdigit() else (-1, p) for p in section_number.split('.'))
+
+
+def _group_by_section(results: List[Dict]):
+    """按章节号排序后分组，依次产出 (章节号, 章节标题, 该章节的作答结果列表)
+
+    章节标题取该章节第一条结果的标题；章节号相同的结果保持原有顺序
+    """
+    grouped = defaultdict(list)
+    for r in results:
+        grouped[r.get('section_number', '其他')].append(r)
+    
+    # 只对去重后的章节号排序，排序键每个章节只计算一次
+    for _, section_num in sorted((_section_sort_key(num), num) for num in grouped):
+        items = grouped[section_num]
+        yield section_num, items[0].get('section_title', ''), items
+
+
+def _content_image_ids(content: str) -> List[int]:
+    """提取内容中 {{IMAGE_ID_xxx}} 占位符的图片ID，按出现顺序去重"""
+    if not content:
+        return []
+    return list(dict.fromkeys(int(image_id) for image_id in _IMAGE_ID_RE.findall(content)))
+
+
+def _ratio_upper_bound(a: str, b: str) -> float:
+    """SequenceMatcher(None, a, b).ratio() 的上界
+
+    ratio 的匹配块总长不超过最长公共子序列长度，LCS 由 rapidfuzz 的 C++ 位并行实现计算，
+    代价远低于 ratio 本身，且比 quick_ratio 的字符计数上界更紧
+    """
+    length = len(a) + len(b)
+    if not length:
+        return 1.0
+    return 2.0 * LCSseq.similarity(a, b) / length
 
 
 class BidDocumentParser:
     """招标文档解析器 - 专门处理招标/投标文档的章节结构"""
     
-    # 章节编号正则模式 - 注意：只匹配真正的章节编号，不匹配列表项
-    SECTION_NUMBER_PATTERNS = [
+    # 章节编号正则 - 注意：只匹配真正的章节编号，不匹配列表项
+    # 三种格式合并为一个正则，按命名分组区分，每段落只需匹配一次
+    SECTION_NUMBER_PATTERN = re.compile(
+        r'^(?:'
         # 1.4.1 或 1.4 格式（必须有点号分隔的多级编号）
-        r'^(\d+\.\d+(?:\.\d+)*)\s*[\.、\s]?\s*(.+)',
+        r'(?P<dec>\d+\.\d+(?:\.\d+)*)\s*[\.、\s]?\s*(?P<dec_t>.+)'
         # 一、二、三 格式（中文章节）
-        r'^([一二三四五六七八九十]+)[、\.]\s*(.+)',
+        r'|(?P<cn>[一二三四五六七八九十]+)[、\.]\s*(?P<cn_t>.+)'
         # 第一章、第二节 格式
-        r'^第([一二三四五六七八九十\d]+)[章节条款]\s*(.+)',
-    ]
+        r'|第(?P<chap>[一二三四五六七八九十\d]+)[章节条款]\s*(?P<chap_t>.+)'
+        r')'
+    )
     # 注意：不再包含 (1) 和 1) 格式，因为这些通常是列表项而不是章节标题
     
     # 技术要求表格的列名关键词
     TABLE_HEADER_KEYWORDS = ['序号', '技术要求', '技术规格', '功能要求', '参数', '指标', '规格', '要求']
+    TABLE_HEADER_PATTERN = re.compile('|'.join(map(re.escape, TABLE_HEADER_KEYWORDS)))
     
     def __init__(self, file_path: str = None):
         """
@@ -52,14 +471,23 @@ class BidDocumentParser:
             file_path: Word文档路径
         """
         self.file_path = file_path
-        self.doc = None
+        self._doc = None  # 首次访问 doc 时才加载（见 doc 属性）
         self.document_structure = {}  # 解析后的文档结构
         self.section_index = {}  # 章节编号索引 {'1.4.1': {...}, '1.4.2': {...}}
+        self._normalized_index = {}  # 标准化编号 -> 章节编号 {'1.4.1': '1.04.1'}
         # 用于自动生成章节编号的计数器（支持10级标题）
         self.heading_counters = [0] * 10
-        
-        if file_path and os.path.exists(file_path):
-            self.doc = DocumentLoader(file_path)
+    
+    @property
+    def doc(self):
+        """Word 文档对象，构造时只记录路径，首次使用时才解压并解析 docx"""
+        if self._doc is None and self.file_path and os.path.exists(self.file_path):
+            self._doc = DocumentLoader(self.file_path)
+        return self._doc
+    
+    @doc.setter
+    def doc(self, value):
+        self._doc = value
     
     def load_document(self, file_path: str):
         """加载文档"""
@@ -67,6 +495,7 @@ class BidDocumentParser:
         self.doc = DocumentLoader(file_path)
         self.document_structure = {}
         self.section_index = {}
+        self._normalized_index = {}
         self.heading_counters = [0] * 10  # 重置计数器
     
     def parse_document_structure(self) -> Dict[str, Any]:
@@ -95,24 +524,25 @@ class BidDocumentParser:
             raise ValueError("请先加载文档")
         
         sections = {}
+        children_sets = {}  # 章节编号 -> 已加入 children 的子章节编号集合，避免在列表上做成员判断
         current_section = None
         current_content = []
         
         # 遍历文档元素
         for element in self._iter_block_items(self.doc):
             if isinstance(element, Paragraph):
-                text = element.text.strip()
+                text = _paragraph_text(element._p).strip()
                 if not text:
                     continue
                 
                 # 尝试识别章节标题
-                section_info = self._parse_section_title(element)
+                section_info = self._parse_section_title(element, text)
                 
                 if section_info:
                     # 保存上一个章节的内容
                     if current_section:
                         current_section['content'] = '\n'.join(current_content)
-                        current_content = []
+                        current_content.clear()
                     
                     # 创建新章节
                     section_number = section_info['number']
@@ -128,11 +558,14 @@ class BidDocumentParser:
                         'raw_title': text
                     }
                     sections[section_number] = current_section
+                    children_sets[section_number] = set()
                     
                     # 更新父章节的children
                     parent_num = current_section['parent_number']
                     if parent_num and parent_num in sections:
-                        if section_number not in sections[parent_num]['children']:
+                        siblings = children_sets[parent_num]
+                        if section_number not in siblings:
+                            siblings.add(section_number)
                             sections[parent_num]['children'].append(section_number)
                 else:
                     # 普通段落，检查是否是需求项
@@ -146,10 +579,12 @@ class BidDocumentParser:
                 if current_section:
                     table_data = self._parse_table(element)
                     if table_data:
+                        # row_values 只供本次需求提取使用，不随解析结构返回给接口
+                        row_values = table_data.pop('row_values')
                         current_section['tables'].append(table_data)
                         # 如果是需求表格，提取需求项
                         if table_data.get('type') == 'requirement_table':
-                            table_reqs = self._extract_requirements_from_table(table_data)
+                            table_reqs = self._extract_requirements_from_table(table_data, row_values)
                             current_section['requirements'].extend(table_reqs)
         
         # 保存最后一个章节
@@ -158,6 +593,10 @@ class BidDocumentParser:
         
         self.document_structure = sections
         self.section_index = sections
+        # 标准化编号索引，同一标准化编号对应多个章节时保留文档中靠前的章节
+        self._normalized_index = {}
+        for key in sections:
+            self._normalized_index.setdefault(self._normalize_section_number(key), key)
         
         return sections
     
@@ -170,13 +609,11 @@ class BidDocumentParser:
         else:
             parent_elm = parent
         
-        for child in parent_elm.iterchildren():
-            if child.tag.endswith("}p"):
-                yield Paragraph(child, parent)
-            elif child.tag.endswith("}tbl"):
-                yield Table(child, parent)
+        # iterchildren 按标签在 lxml 内部过滤，再按标签取对应的包装类
+        for child in parent_elm.iterchildren(*_BLOCK_CTORS):
+            yield _BLOCK_CTORS[child.tag](child, parent)
     
-    def _parse_section_title(self, para: Paragraph) -> Optional[Dict]:
+    def _parse_section_title(self, para: Paragraph, text: Optional[str] = None) -> Optional[Dict]:
         """
         解析段落是否为章节标题
         
@@ -184,38 +621,48 @@ class BidDocumentParser:
         1. 文本以章节编号开头（如 "1.4.1 国产数据库技术要求"）
         2. 段落使用 Word 标题样式（如 Heading 1, Heading 2），自动生成编号
         
+        Args:
+            para: 段落
+            text: 已去除首尾空白的段落文本，调用方已取得时传入，避免再次从 XML 拼接段落文本
+        
         Returns:
             {'number': '1.4.1', 'title': '国产数据库技术要求', 'level': 3} 或 None
         """
-        text = para.text.strip()
+        if text is None:
+            text = _paragraph_text(para._p).strip()
         if not text:
             return None
         
-        # 获取段落的样式和大纲级别
-        style_name = para.style.name if para.style else ''
-        outline_level = self._get_paragraph_outline_level(para)
+        # 情况1：尝试匹配文本中的章节编号（多数标题在这里返回，不需要读取样式和大纲级别）
+        match = self.SECTION_NUMBER_PATTERN.match(text)
+        if match:
+            if match.group('dec') is not None:
+                number, title = match.group('dec', 'dec_t')
+            elif match.group('cn') is not None:
+                number, title = match.group('cn', 'cn_t')
+            else:
+                number, title = match.group('chap', 'chap_t')
+            title = title.strip()
+            
+            # 计算层级
+            if '.' in number:
+                level = len(number.split('.'))
+            elif number.isdigit():
+                level = 1
+            else:
+                # 中文数字
+                level = self._get_paragraph_outline_level(para) or 1
+            
+            return {
+                'number': number,
+                'title': title,
+                'level': level
+            }
         
-        # 情况1：尝试匹配文本中的章节编号
-        for pattern in self.SECTION_NUMBER_PATTERNS:
-            match = re.match(pattern, text)
-            if match:
-                number = match.group(1)
-                title = match.group(2).strip() if len(match.groups()) > 1 else ''
-                
-                # 计算层级
-                if '.' in number:
-                    level = len(number.split('.'))
-                elif number.isdigit():
-                    level = 1
-                else:
-                    # 中文数字
-                    level = outline_level or 1
-                
-                return {
-                    'number': number,
-                    'title': title,
-                    'level': level
-                }
+        # 获取段落的样式和大纲级别（para.style 每次访问都要查找样式，只取一次）
+        style = para.style
+        style_name = style.name if style else ''
+        outline_level = self._get_paragraph_outline_level(para, style_name)
         
         # 情况2：如果是标题样式（Heading 1/2/3 或 标题 1/2/3），自动生成编号
         heading_level = self._get_heading_level_from_style(style_name)
@@ -243,7 +690,7 @@ class BidDocumentParser:
         if outline_level:
             # 检查是否以章节编号格式开头（必须包含点号，如 1.2、1.2.3）
             # 不匹配 "1. xxx" 这种列表格式
-            num_match = re.match(r'^(\d+\.\d+(?:\.\d+)*)\s*(.+)', text)
+            num_match = _OUTLINE_NUMBERED_TITLE_RE.match(text)
             if num_match:
                 return {
                     'number': num_match.group(1).rstrip('.'),
@@ -253,7 +700,9 @@ class BidDocumentParser:
         
         return None
     
-    def _get_heading_level_from_style(self, style_name: str) -> Optional[int]:
+    @staticmethod
+    @functools.lru_cache(maxsize=256)
+    def _get_heading_level_from_style(style_name: str) -> Optional[int]:
         """
         从样式名称获取标题级别
         
@@ -265,35 +714,24 @@ class BidDocumentParser:
         if not style_name:
             return None
         
-        # 匹配 "Heading X" 或 "标题 X"
-        patterns = [
-            r'^Heading\s*(\d+)$',
-            r'^标题\s*(\d+)$',
-            r'^Title\s*(\d+)$',
-        ]
-        
-        for pattern in patterns:
-            match = re.match(pattern, style_name, re.IGNORECASE)
-            if match:
-                return int(match.group(1))
-        
-        return None
+        # 匹配 "Heading X"、"标题 X" 或 "Title X"（文档中的样式名很少，结果按样式名缓存）
+        match = _HEADING_STYLE_PATTERN.match(style_name)
+        return int(match.group(1)) if match else None
     
-    def _get_paragraph_outline_level(self, para: Paragraph) -> Optional[int]:
-        """获取段落的大纲级别"""
-        try:
-            p_pr = para._element.pPr
-            if p_pr is not None:
-                outline_lvl = p_pr.find(qn("w:outlineLvl"))
-                if outline_lvl is not None:
-                    return int(outline_lvl.get(qn("w:val"))) + 1
-        except Exception:
-            pass
+    def _get_paragraph_outline_level(self, para: Paragraph, style_name: Optional[str] = None) -> Optional[int]:
+        """获取段落的大纲级别，调用方已取得样式名时可通过 style_name 传入以免重复查找样式"""
+        vals = _OUTLINE_LEVEL_XPATH(para._element)
+        if vals:
+            try:
+                return int(vals[0]) + 1
+            except ValueError:
+                pass
         
         # 从样式名推断
-        style_name = getattr(para.style, "name", "") if para.style else ""
+        if style_name is None:
+            style_name = getattr(para.style, "name", "") if para.style else ""
         if any(h in style_name for h in ["Heading", "标题", "Title"]):
-            match = re.search(r"(\d+)", style_name)
+            match = _DIGITS_RE.search(style_name)
             return int(match.group(1)) if match else 1
         
         return None
@@ -314,15 +752,12 @@ class BidDocumentParser:
         - (1) 承诺应答产品...
         - ① 支持...
         """
-        patterns = [
-            r'^(\d+)[\.、\)]\s*(.+)',  # 1. 或 1、或 1)
-            r'^\((\d+)\)\s*(.+)',      # (1)
-            r'^([①②③④⑤⑥⑦⑧⑨⑩])\s*(.+)',  # 圆圈数字
-            r'^[•·]\s*(.+)',            # 项目符号
-        ]
+        # 普通正文段落首字符即可排除，不必逐个尝试正则（\d 也匹配全角数字，故用 isdecimal 判断）
+        if not text or not (text[0].isdecimal() or text[0] in _REQUIREMENT_ITEM_FIRST_CHARS):
+            return None
         
-        for pattern in patterns:
-            match = re.match(pattern, text)
+        for pattern in _REQUIREMENT_ITEM_PATTERNS:
+            match = pattern.match(text)
             if match:
                 groups = match.groups()
                 if len(groups) == 2:
@@ -348,50 +783,82 @@ class BidDocumentParser:
             {
                 'type': 'requirement_table' | 'data_table',
                 'headers': ['序号', '技术要求', '技术规格'],
-                'rows': [{'序号': '1', '技术要求': 'SQL语法', '技术规格': '支持SQL2003标准'}]
+                'rows': [{'序号': '1', '技术要求': 'SQL语法', '技术规格': '支持SQL2003标准'}],
+                'row_values': [['1', 'SQL语法', '支持SQL2003标准']]
             }
+            row_values 为与 headers 按位置对齐的单元格文本，仅供需求提取使用，调用方需在保存解析结构前取出
         """
-        if not table.rows:
+        grid = self._table_cell_texts(table)
+        if not grid:
             return None
         
         # 获取表头
-        headers = []
-        header_row = table.rows[0]
-        for cell in header_row.cells:
-            cell_text = self._get_cell_text(cell)
-            headers.append(cell_text)
+        headers = grid[0]
         
         # 判断是否为需求表格
-        is_requirement_table = any(
-            keyword in ''.join(headers) 
-            for keyword in self.TABLE_HEADER_KEYWORDS
-        )
+        is_requirement_table = self.TABLE_HEADER_PATTERN.search(''.join(headers)) is not None
         
         # 解析数据行
         rows = []
-        for row_idx, row in enumerate(table.rows[1:], start=1):
-            row_data = {}
-            for col_idx, cell in enumerate(row.cells):
-                header = headers[col_idx] if col_idx < len(headers) else f'col_{col_idx}'
-                row_data[header] = self._get_cell_text(cell)
+        row_values = []  # 与 headers 按位置对齐的单元格文本，供需求提取按下标取值
+        n_headers = len(headers)
+        for row_idx, cell_texts in enumerate(grid[1:], start=1):
+            # 行字典供接口返回；同名表头以靠后的列为准，超出表头的列命名为 col_N
+            row_data = dict(zip(headers, cell_texts))
+            for col_idx in range(n_headers, len(cell_texts)):
+                row_data[f'col_{col_idx}'] = cell_texts[col_idx]
+            if cell_texts:
                 row_data['index'] = row_idx
             rows.append(row_data)
+            row_values.append([row_data.get(h, '') for h in headers])
         
         return {
             'type': 'requirement_table' if is_requirement_table else 'data_table',
             'headers': headers,
-            'rows': rows
+            'rows': rows,
+            'row_values': row_values
         }
     
+    @staticmethod
+    def _table_cell_texts(table: Table) -> List[List[str]]:
+        """
+        单次遍历 <w:tbl> 的 XML，返回每行各单元格的文本
+        
+        table.rows / row.cells 每次访问都会重建整张表的单元格布局，大表格逐行读取代价很高，
+        这里直接读取 <w:tr>/<w:tc>，合并单元格的处理与 row.cells 一致：
+        横向合并（gridSpan）重复该单元格文本，纵向合并的后续行（vMerge=continue）取上一行同位置单元格的文本。
+        """
+        grid = []
+        above = {}  # 上一行 {网格起始列: 单元格文本}
+        for tr in table._tbl.iterchildren(qn('w:tr')):
+            texts = []
+            current = {}
+            offset = tr.grid_before
+            for tc in tr.iterchildren(qn('w:tc')):
+                span = tc.grid_span
+                if tc.vMerge == 'continue':
+                    text = above.get(offset, '')
+                else:
+                    para_texts = (_paragraph_text(p).strip() for p in tc.iterchildren(qn('w:p')))
+                    text = '\n'.join(t for t in para_texts if t)
+                current[offset] = text
+                texts.extend([text] * span)
+                offset += span
+            grid.append(texts)
+            above = current
+        return grid
+    
     def _get_cell_text(self, cell) -> str:
         """获取单元格文本"""
         texts = []
         for para in cell.paragraphs:
-            if para.text.strip():
-                texts.append(para.text.strip())
+            para_text = _paragraph_text(para._p).strip()
+            if para_text:
+                texts.append(para_text)
         return '\n'.join(texts)
     
-    def _extract_requirements_from_table(self, table_data: Dict) -> List[Dict]:
+    def _extract_requirements_from_table(self, table_data: Dict,
+                                         row_values: Optional[List[List[str]]] = None) -> List[Dict]:
         """
         从表格数据中提取技术要求
         
@@ -402,6 +869,7 @@ class BidDocumentParser:
         
         Args:
             table_data: 表格数据 {'headers': [...], 'rows': [...]}
+            row_values: _parse_table 生成的按表头位置对齐的行数据，未提供时由 rows 重新生成
         
         Returns:
             需求列表 [{'index': 1, 'text': '技术要求内容', 'spec': '规格要求', 'type': 'table'}]
@@ -413,101 +881,70 @@ class BidDocumentParser:
         if not rows:
             return []
         
-        # 识别列映射关系
-        header_lower = [h.strip().lower() for h in headers]
-        header_map = {
-            'index': None,      # 序号列
-            'requirement': None,  # 技术要求列
-            'spec': None         # 技术规格列
-        }
+        # 与 headers 按位置对齐的行数据
+        if row_values is None:
+            row_values = [[row.get(h, '') for h in headers] for row in rows]
         
-        # 识别序号列
+        # 单次遍历表头识别列映射关系：
+        # 序号列取第一个命中的列；要求/规格列取关键词优先级最高的列（同优先级取靠前的列）
+        index_col = req_col = spec_col = None
+        req_rank = spec_rank = None
         for i, h in enumerate(headers):
-            h_clean = h.strip()
-            if h_clean in ['序号', '编号', '项', 'No', 'No.', '#']:
-                header_map['index'] = i
-                break
-        
-        # 识别技术要求列
-        req_keywords = ['技术要求', '功能要求', '要求', '功能', '项目', '名称', '技术项']
-        for kw in req_keywords:
-            for i, h in enumerate(headers):
-                if kw in h:
-                    header_map['requirement'] = i
-                    break
-            if header_map['requirement'] is not None:
-                break
-        
-        # 识别技术规格列
-        spec_keywords = ['技术规格', '规格', '规格要求', '参数', '参数值', '技术参数', '指标', '指标要求']
-        for kw in spec_keywords:
-            for i, h in enumerate(headers):
-                if kw in h:
-                    header_map['spec'] = i
-                    break
-            if header_map['spec'] is not None:
-                break
+            if index_col is None and h.strip() in _INDEX_HEADERS:
+                index_col = i
+            rank = _keyword_rank(h, _REQUIREMENT_HEADER_KEYWORDS)
+            if rank is not None and (req_rank is None or rank < req_rank):
+                req_col, req_rank = i, rank
+            rank = _keyword_rank(h, _SPEC_HEADER_KEYWORDS)
+            if rank is not None and (spec_rank is None or rank < spec_rank):
+                spec_col, spec_rank = i, rank
         
         # 如果没有找到明确的要求列，使用智能推断
-        if header_map['requirement'] is None:
+        if req_col is None:
             # 尝试找第二列（通常序号后面是要求）
-            if len(headers) >= 2 and header_map['index'] == 0:
-                header_map['requirement'] = 1
+            if len(headers) >= 2 and index_col == 0:
+                req_col = 1
             elif len(headers) >= 1:
-                header_map['requirement'] = 0
+                req_col = 0
         
-        if header_map['spec'] is None and len(headers) >= 3:
+        if spec_col is None and len(headers) >= 3:
             # 尝试找第三列作为规格
-            if header_map['requirement'] is not None:
+            if req_col is not None:
                 for i in range(len(headers)):
-                    if i != header_map['index'] and i != header_map['requirement']:
-                        header_map['spec'] = i
+                    if i != index_col and i != req_col:
+                        spec_col = i
                         break
         
+        # 要求/规格列为空时按表头名依次尝试的备选列
+        req_fallback_cols = [headers.index(key) for key in _REQUIREMENT_FALLBACK_HEADERS if key in headers]
+        spec_fallback_cols = [headers.index(key) for key in _SPEC_FALLBACK_HEADERS if key in headers]
+        
         # 提取每一行的需求
-        for row_idx, row in enumerate(rows):
+        for row_idx, (row, values) in enumerate(zip(rows, row_values)):
             # 获取序号
-            if header_map['index'] is not None:
-                idx_key = headers[header_map['index']]
-                index_val = row.get(idx_key, '') or row.get('index', row_idx + 1)
-            else:
-                index_val = row.get('序号', '') or row.get('index', row_idx + 1)
+            index_val = (values[index_col] if index_col is not None else '') or row_idx + 1
             
             # 清理序号（可能是带有箭头符号的）
             if isinstance(index_val, str):
-                index_val = index_val.replace('↵', '').replace('←', '').strip()
+                index_val = index_val.translate(_INDEX_CELL_TRANSLATION).strip()
             
             # 获取技术要求
-            req_text = ''
-            if header_map['requirement'] is not None:
-                req_key = headers[header_map['requirement']]
-                req_text = row.get(req_key, '')
-            
+            req_text = values[req_col] if req_col is not None else ''
             if not req_text:
-                # 尝试其他可能的键
-                for key in ['技术要求', '功能要求', '要求', '功能', '项目']:
-                    if key in row and row[key]:
-                        req_text = row[key]
-                        break
+                # 尝试其他可能的列
+                req_text = next((values[i] for i in req_fallback_cols if values[i]), '')
             
             # 获取技术规格
-            spec_text = ''
-            if header_map['spec'] is not None:
-                spec_key = headers[header_map['spec']]
-                spec_text = row.get(spec_key, '')
-            
+            spec_text = values[spec_col] if spec_col is not None else ''
             if not spec_text:
-                # 尝试其他可能的键
-                for key in ['技术规格', '规格', '规格要求', '参数', '参数值']:
-                    if key in row and row[key]:
-                        spec_text = row[key]
-                        break
+                # 尝试其他可能的列
+                spec_text = next((values[i] for i in spec_fallback_cols if values[i]), '')
             
             # 清理文本中的特殊字符
             if req_text:
-                req_text = req_text.replace('↵', '\n').replace('←', '').strip()
+                req_text = req_text.translate(_TEXT_CELL_TRANSLATION).strip()
             if spec_text:
-                spec_text = spec_text.replace('↵', '\n').replace('←', '').strip()
+                spec_text = spec_text.translate(_TEXT_CELL_TRANSLATION).strip()
             
             # 组合成需求项（技术要求 + 技术规格 作为完整的要求描述）
             if req_text or spec_text:
@@ -536,14 +973,12 @@ class BidDocumentParser:
             return self.section_index[section_number]
         
         # 尝试模糊匹配（处理前导零等情况）
-        normalized = self._normalize_section_number(section_number)
-        for key in self.section_index:
-            if self._normalize_section_number(key) == normalized:
-                return self.section_index[key]
-        
-        return None
+        key = self._normalized_index.get(self._normalize_section_number(section_number))
+        return self.section_index.get(key) if key is not None else None
     
-    def _normalize_section_number(self, number: str) -> str:
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def _normalize_section_number(number: str) -> str:
         """标准化章节编号"""
         # 去除前导零
         parts = number.split('.')
@@ -615,10 +1050,12 @@ class BidDocumentParser:
                     req['section_title'] = section.get('title', '')
                     requirements.append(req)
         
-        # 如果还没有，尝试从表格中重新提取（以防parse时漏掉）
+        # 如果还没有，尝试从需求表格中重新提取（以防parse时漏掉）；普通数据表格不提取，避免产生噪声需求
         if not requirements:
             logger.info(f"章节 {section_number} 尝试从表格重新提取，共 {len(section.get('tables', []))} 个表格")
             for table_data in section.get('tables', []):
+                if table_data.get('type') != 'requirement_table':
+                    continue
                 table_reqs = self._extract_requirements_from_table(table_data)
                 for req in table_reqs:
                     req['section'] = section_number
@@ -671,15 +1108,6 @@ class BidDocumentParser:
         requirements = []
         lines = content.split('\n')
         
-        # 需求项的正则模式
-        patterns = [
-            r'^(\d+)[\.、\)]\s*(.+)',      # 1. 或 1、或 1)
-            r'^\((\d+)\)\s*(.+)',           # (1)
-            r'^([①②③④⑤⑥⑦⑧⑨⑩⑪⑫⑬⑭⑮])\s*(.+)',  # 圆圈数字
-            r'^[•·▪➢►]\s*(.+)',             # 项目符号
-            r'^[（\(](\d+)[）\)]\s*(.+)',   # 中文括号
-        ]
-        
         current_index = 0
         current_text = []
         has_numbered_items = False  # 标记是否有编号格式的项
@@ -689,41 +1117,37 @@ class BidDocumentParser:
             if not line:
                 continue
             
-            matched = False
-            for pattern in patterns:
-                match = re.match(pattern, line)
-                if match:
-                    has_numbered_items = True
-                    # 保存上一个需求
-                    if current_text:
-                        requirements.append({
-                            'index': current_index,
-                            'text': '\n'.join(current_text),
-                            'spec': '',
-                            'type': 'list'
-                        })
-                    
-                    # 开始新需求
-                    groups = match.groups()
-                    if len(groups) == 2:
-                        idx_str = groups[0]
-                        # 处理圆圈数字
-                        if idx_str in '①②③④⑤⑥⑦⑧⑨⑩⑪⑫⑬⑭⑮':
-                            current_index = '①②③④⑤⑥⑦⑧⑨⑩⑪⑫⑬⑭⑮'.index(idx_str) + 1
-                        else:
-                            try:
-                                current_index = int(idx_str)
-                            except ValueError:
-                                current_index = len(requirements) + 1
-                        current_text = [groups[1]]
-                    else:
-                        current_index = len(requirements) + 1
-                        current_text = [groups[0]]
-                    
-                    matched = True
-                    break
+            # 首字符不可能开始编号项时跳过正则匹配
+            match = None
+            if line[0].isdecimal() or line[0] in _CONTENT_REQUIREMENT_FIRST_CHARS:
+                match = _CONTENT_REQUIREMENT_PATTERN.match(line)
             
-            if not matched and current_text:
+            if match:
+                has_numbered_items = True
+                # 保存上一个需求
+                if current_text:
+                    requirements.append({
+                        'index': current_index,
+                        'text': '\n'.join(current_text),
+                        'spec': '',
+                        'type': 'list'
+                    })
+                
+                # 开始新需求
+                idx_str = match.group('num') or match.group('paren') or match.group('circ') or match.group('cn_paren')
+                if idx_str is None:
+                    # 项目符号没有编号
+                    current_index = len(requirements) + 1
+                elif idx_str in _CIRCLED_NUMBERS:
+                    # 处理圆圈数字
+                    current_index = _CIRCLED_NUMBERS[idx_str]
+                else:
+                    try:
+                        current_index = int(idx_str)
+                    except ValueError:
+                        current_index = len(requirements) + 1
+                current_text = [match.group(match.lastgroup)]
+            elif current_text:
                 # 追加到当前需求
                 current_text.append(line)
         
@@ -768,18 +1192,18 @@ class UserInstructionParser:
     """用户指令解析器 - 解析用户的作答指令"""
     
     # 指令模式
-    INSTRUCTION_PATTERNS = [
+    INSTRUCTION_PATTERNS = (
         # 针对文档中的1.4.1,1.4.2作答
-        r'针对.*?(?:文档|文件)?.*?(?:中的|里的|的)?([0-9\.,、\s]+)作答',
+        re.compile(r'针对.*?(?:文档|文件)?.*?(?:中的|里的|的)?([0-9\.,、\s]+)作答'),
         # 回答1.4.1和1.4.2
-        r'回答\s*([0-9\.,、和与\s]+)',
+        re.compile(r'回答\s*([0-9\.,、和与\s]+)'),
         # 对1.4.1,1.4.2进行作答/回复
-        r'对\s*([0-9\.,、和与\s]+)\s*(?:进行)?(?:作答|回复|回答)',
+        re.compile(r'对\s*([0-9\.,、和与\s]+)\s*(?:进行)?(?:作答|回复|回答)'),
         # 1.4.1,1.4.2 章节
-        r'([0-9]+(?:\.[0-9]+)+(?:\s*[,、和与]\s*[0-9]+(?:\.[0-9]+)+)*)\s*(?:章节|部分)?',
+        re.compile(r'([0-9]+(?:\.[0-9]+)+(?:\s*[,、和与]\s*[0-9]+(?:\.[0-9]+)+)*)\s*(?:章节|部分)?'),
         # 章节1.4.1,1.4.2
-        r'章节\s*([0-9\.,、和与\s]+)',
-    ]
+        re.compile(r'章节\s*([0-9\.,、和与\s]+)'),
+    )
     
     def __init__(self):
         pass
@@ -808,13 +1232,13 @@ class UserInstructionParser:
         }
         
         # 尝试提取文档名
-        doc_match = re.search(r'["""]([^"""]+)["""]|文档[《]([^》]+)[》]', instruction)
+        doc_match = _DOCUMENT_NAME_RE.search(instruction)
         if doc_match:
             result['document_name'] = doc_match.group(1) or doc_match.group(2)
         
         # 尝试匹配各种指令模式
         for pattern in self.INSTRUCTION_PATTERNS:
-            match = re.search(pattern, instruction)
+            match = pattern.search(instruction)
             if match:
                 numbers_str = match.group(1)
                 section_numbers = self._extract_section_numbers(numbers_str)
@@ -844,20 +1268,10 @@ class UserInstructionParser:
         - 1.4.1和1.4.2
         - 1.4.1 1.4.2
         """
-        # 匹配章节编号模式：数字.数字.数字...
-        pattern = r'\d+(?:\.\d+)+'
-        matches = re.findall(pattern, text)
-        
-        # 去重并保持顺序
-        seen = set()
-        unique_numbers = []
-        for num in matches:
-            normalized = self._normalize_number(num)
-            if normalized not in seen:
-                seen.add(normalized)
-                unique_numbers.append(normalized)
-        
-        return unique_numbers
+        # 匹配章节编号模式：数字.数字.数字...，标准化后去重并保持顺序
+        return list(dict.fromkeys(
+            self._normalize_number(m.group()) for m in _SECTION_NUMBER_RE.finditer(text)
+        ))
     
     def _normalize_number(self, number: str) -> str:
         """标准化章节编号"""
@@ -961,7 +1375,7 @@ class BidResponseGenerator:
         }
     
     def _get_section_from_db(self, doc_id: int, section_number: str) -> Optional[Dict]:
-        """从数据库获取已解析的章节"""
+        """从数据库获取已解析的章节（同一文档的章节在多次作答请求中反复查询，走 Redis 查询缓存）"""
         # 尝试按标题匹配
         sql = """
             SELECT c.id, c.title, c.content, c.level, c.parent_id
@@ -972,7 +1386,7 @@ class BidResponseGenerator:
         pattern1 = f'{section_number}%'
         pattern2 = f'%{section_number}%'
         
-        result = fetch_one(sql, (doc_id, pattern1, pattern2))
+        result = fetch_one_cached(sql, (doc_id, pattern1, pattern2))
         
         if result:
             return {
@@ -988,47 +1402,39 @@ class BidResponseGenerator:
         return None
     
     def _extract_requirements_from_content(self, content: str) -> List[Dict]:
-        """从内容中提取需求项"""
+        """从内容中提取需求项（解析结果按内容缓存，返回副本以免调用方修改缓存内容）"""
+        return [dict(req) for req in self._parse_content_requirements(content)]
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=1024)
+    def _parse_content_requirements(content: str) -> Tuple[Dict, ...]:
+        """从内容中解析需求项，同一章节内容在多次作答请求中只解析一次"""
         if not content:
-            return []
-        
-        requirements = []
-        lines = content.split('\n')
+            return ()
         
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-            
-            # 检查是否是需求项
-            req_patterns = [
-                r'^(\d+)[\.、\)]\s*(.+)',
-                r'^\((\d+)\)\s*(.+)',
-            ]
-            
-            for pattern in req_patterns:
-                match = re.match(pattern, line)
-                if match:
-                    requirements.append({
-                        'index': match.group(1),
-                        'text': match.group(2),
-                        'type': 'list'
-                    })
-                    break
+        requirements = [
+            {
+                'index': match.group(1) or match.group(2),
+                'text': match.group(3),
+                'type': 'list'
+            }
+            for match in _STORED_REQUIREMENT_RE.finditer(content)
+        ]
         
         # 检查是否有表格标记
         if '[表格]' in content:
-            table_reqs = self._parse_table_from_text(content)
+            table_reqs = BidResponseGenerator._parse_table_from_text(content)
             requirements.extend(table_reqs)
         
-        return requirements
+        return tuple(requirements)
     
-    def _parse_table_from_text(self, content: str) -> List[Dict]:
+    @staticmethod
+    def _parse_table_from_text(content: str) -> List[Dict]:
         """从文本中解析表格（WordParser存储的格式）"""
         requirements = []
         
         # 查找表格内容
-        table_match = re.search(r'\[表格\](.*?)\[/表格\]', content, re.DOTALL)
+        table_match = _STORED_TABLE_RE.search(content)
         if not table_match:
             return []
         
@@ -1081,6 +1487,14 @@ class BidAnswerMatcher:
     FUZZY_MATCH_THRESHOLD = 0.60
     SEMANTIC_MATCH_THRESHOLD = 0.50
     
+    # 语义匹配交给 LLM 判断的候选章节数：有向量检索结果时取相似度最高的前 N 个，否则按文档取前 N 个
+    SEMANTIC_LLM_TOP_K = 8
+    SEMANTIC_LLM_MAX_CANDIDATES = 20
+    
+    # 要求开头的短语完整出现在章节标题中时，直接按该分值计分，不再计算相似度
+    TITLE_PHRASE_MATCH_SCORE = 0.95
+    TITLE_PHRASE_MIN_LENGTH = 4
+    
     def __init__(self, llm_service=None, web_search_service=None):
         """
         初始化匹配器
@@ -1094,7 +1508,8 @@ class BidAnswerMatcher:
     
     def match_requirement(self, requirement_text: str, username: str, 
                           knowledge_doc_ids: List[int] = None,
-                          enable_web_search: bool = True) -> Dict:
+                          enable_web_search: bool = True,
+                          resolve_images: bool = True) -> Dict:
         """
         对单个技术要求进行三级匹配
         
@@ -1109,6 +1524,8 @@ class BidAnswerMatcher:
             username: 用户名
             knowledge_doc_ids: 知识库文档ID列表
             enable_web_search: 是否启用网络搜索
+            resolve_images: 是否立即查询来源图片；为 False 时 source 中保留 image_ids，
+                由调用方对整批结果调用 resolve_source_images
         
         Returns:
             {
@@ -1132,13 +1549,16 @@ class BidAnswerMatcher:
         # 1. 精确匹配
         exact_match = self._exact_match(requirement_text, username, knowledge_doc_ids)
         if exact_match:
+            if resolve_images:
+                self.resolve_source_images([exact_match])
             return exact_match
         
-        # 2. 语义匹配
-        if self.llm_service:
-            semantic_match = self._semantic_match(requirement_text, username, knowledge_doc_ids)
-            if semantic_match:
-                return semantic_match
+        # 2. 语义匹配（向量检索优先，未命中时回退到 LLM）
+        semantic_match = self._semantic_match(requirement_text, username, knowledge_doc_ids)
+        if semantic_match:
+            if resolve_images:
+                self.resolve_source_images([semantic_match])
+            return semantic_match
         
         # 3. 网络搜索
         if enable_web_search and self.web_search_service:
@@ -1173,30 +1593,7 @@ class BidAnswerMatcher:
         if not keywords:
             return None
         
-        # 构建搜索条件
-        like_conditions = []
-        for kw in keywords[:5]:  # 取前5个关键词
-            like_conditions.append("(c.title LIKE %s OR c.content LIKE %s)")
-            params.extend([f'%{kw}%', f'%{kw}%'])
-        
-        if like_conditions:
-            conditions.append(f"({' OR '.join(like_conditions)})")
-        
-        sql = f"""
-            SELECT c.id as chapter_id, c.document_id, c.title as chapter_title, 
-                   c.content, c.level, c.parent_id,
-                   dpr.filename
-            FROM chapters c
-            JOIN doc_process_records dpr ON c.document_id = dpr.doc_id
-            WHERE {' AND '.join(conditions)}
-            LIMIT 30
-        """
-        
-        try:
-            candidates = fetch_all(sql, params)
-        except Exception as e:
-            logger.error(f"精确匹配查询失败: {e}")
-            return None
+        candidates = self._fetch_exact_candidates(conditions, params, keywords)
         
         if not candidates:
             return None
@@ -1205,23 +1602,34 @@ class BidAnswerMatcher:
         best_match = None
         best_similarity = 0
         
-        cleaned_req = self._clean_text(requirement_text)
+        cleaned_req = self._clean_text_prefix(requirement_text, 300)
+        req_title = cleaned_req[:100]
+        req_content = cleaned_req[:300]
+        req_phrase = self._leading_phrase(requirement_text)
         
         for candidate in candidates:
             content = candidate.get('content', '') or ''
             title = candidate.get('chapter_title', '') or ''
             
-            # 计算标题相似度
-            title_sim = SequenceMatcher(None, 
-                cleaned_req[:100], 
-                self._clean_text(title)
-            ).ratio()
+            title_text = self._clean_text(title)
+            
+            # 标题包含要求开头的短语（常见于标题即要求小节名的情况），直接计分
+            if req_phrase and req_phrase in title_text:
+                if self.TITLE_PHRASE_MATCH_SCORE > best_similarity:
+                    best_similarity = self.TITLE_PHRASE_MATCH_SCORE
+                    best_match = candidate
+                continue
+            
+            content_text = self._clean_text_prefix(content, 300)
+            
+            # 上界都不超过当前最佳相似度的候选不可能胜出，跳过 ratio 的完整计算
+            if (_ratio_upper_bound(req_title, title_text) * 1.2 <= best_similarity
+                    and _ratio_upper_bound(req_content, content_text) <= best_similarity):
+                continue
             
-            # 计算内容相似度
-            content_sim = SequenceMatcher(None,
-                cleaned_req[:300],
-                self._clean_text(content)[:300]
-            ).ratio()
+            # 计算标题相似度、内容相似度
+            title_sim = SequenceMatcher(None, req_title, title_text).ratio()
+            content_sim = SequenceMatcher(None, req_content, content_text).ratio()
             
             # 综合相似度
             similarity = max(title_sim * 1.2, content_sim)  # 标题匹配加权
@@ -1236,11 +1644,6 @@ class BidAnswerMatcher:
             
             content = best_match.get('content', '')
             
-            # 从内容中提取图片（优先），如果没有则获取章节关联的图片
-            images = self._get_images_from_content(content)
-            if not images:
-                images = self._get_chapter_images(best_match['chapter_id'])
-            
             return {
                 'answer': content,
                 'match_type': 'exact' if best_similarity >= self.EXACT_MATCH_THRESHOLD else 'semantic',
@@ -1251,44 +1654,84 @@ class BidAnswerMatcher:
                     'chapter_id': best_match.get('chapter_id'),
                     'chapter_title': best_match.get('chapter_title', ''),
                     'path': path,
-                    'images': images
+                    'image_ids': _content_image_ids(content)
                 }
             }
         
         return None
     
-    def _semantic_match(self, requirement_text: str, username: str,
-                        doc_ids: List[int] = None) -> Optional[Dict]:
-        """语义匹配 - 使用LLM分析语义相似度"""
-        if not self.llm_service:
-            return None
+    def _fetch_exact_candidates(self, conditions: List[str], params: List,
+                                keywords: List[str]) -> Optional[List[Dict]]:
+        """
+        按关键词查询精确匹配的候选章节
         
-        # 获取候选章节
-        conditions = ["dpr.username = %s", "dpr.status = 'completed'"]
-        params = [username]
+        优先使用 chapters(title, content) 上的 FULLTEXT 索引（ngram 分词，见 scripts/add_chapters_fulltext.sql），
+        按相关度取前 30 条；索引不存在等原因查询失败时回退到逐关键词 LIKE 查询
+        """
+        search_text = ' '.join(keywords[:8])
+        sql = f"""
+            SELECT c.id as chapter_id, c.document_id, c.title as chapter_title, 
+                   c.content, c.level, c.parent_id,
+                   dpr.filename,
+                   MATCH(c.title, c.content) AGAINST (%s IN NATURAL LANGUAGE MODE) AS rel
+            FROM chapters c
+            JOIN doc_process_records dpr ON c.document_id = dpr.doc_id
+            WHERE {' AND '.join(conditions)}
+            AND MATCH(c.title, c.content) AGAINST (%s IN NATURAL LANGUAGE MODE)
+            ORDER BY rel DESC
+            LIMIT 30
+        """
+        try:
+            return fetch_all(sql, [search_text, *params, search_text])
+        except Exception as e:
+            logger.warning(f"精确匹配全文检索失败，回退到 LIKE 查询: {e}")
         
-        if doc_ids:
-            placeholders = ','.join(['%s'] * len(doc_ids))
-            conditions.append(f"c.document_id IN ({placeholders})")
-            params.extend(doc_ids)
+        # 构建搜索条件
+        like_conditions = []
+        like_params = list(params)
+        for kw in keywords[:5]:  # 取前5个关键词
+            like_conditions.append("(c.title LIKE %s OR c.content LIKE %s)")
+            like_params.extend([f'%{kw}%', f'%{kw}%'])
         
         sql = f"""
             SELECT c.id as chapter_id, c.document_id, c.title as chapter_title, 
-                   c.content, c.level,
+                   c.content, c.level, c.parent_id,
                    dpr.filename
             FROM chapters c
             JOIN doc_process_records dpr ON c.document_id = dpr.doc_id
             WHERE {' AND '.join(conditions)}
-            AND c.content IS NOT NULL AND c.content != ''
-            LIMIT 40
+            AND ({' OR '.join(like_conditions)})
+            LIMIT 30
         """
         
         try:
-            candidates = fetch_all(sql, params)
+            return fetch_all(sql, like_params)
         except Exception as e:
-            logger.error(f"语义匹配查询失败: {e}")
+            logger.error(f"精确匹配查询失败: {e}")
+            return None
+    
+    def _semantic_match(self, requirement_text: str, username: str,
+                        doc_ids: List[int] = None) -> Optional[Dict]:
+        """
+        语义匹配
+        
+        优先用已入库的章节向量（document_embeddings）做余弦相似度检索，只需一次 embedding 调用；
+        向量检索不可用或没有命中时，回退到 LLM 分析候选章节的语义相似度
+        """
+        ranked = self._vector_search(requirement_text, username, doc_ids)
+        if ranked and ranked[0]['similarity'] >= self.SEMANTIC_MATCH_THRESHOLD:
+            vector_match = self._vector_match(ranked[0], username)
+            if vector_match:
+                return vector_match
+        
+        if not self.llm_service:
             return None
         
+        # 向量检索有结果时，只把相似度最高的几个章节交给 LLM 判断
+        candidates = self._fetch_chapters([r['chapter_id'] for r in ranked], username) if ranked else None
+        if not candidates:
+            candidates = self._fetch_semantic_candidates(username, doc_ids)
+        
         if not candidates:
             return None
         
@@ -1299,7 +1742,7 @@ class BidAnswerMatcher:
             text = (c.get('content', '') or '')[:400]
             candidate_texts.append(f"[{i+1}] 标题: {title}\n内容: {text}")
         
-        candidates_str = '\n\n'.join(candidate_texts[:20])  # 限制数量
+        candidates_str = '\n\n'.join(candidate_texts)
         
         prompt = f"""请分析以下技术要求与候选文档内容的相关性，找出最能回答该技术要求的内容。
 
@@ -1310,7 +1753,7 @@ class BidAnswerMatcher:
 {candidates_str}
 
 请返回JSON格式结果：
-{{"best_match_index": 序号（1-{min(len(candidates), 20)}，无相关内容返回0）, "relevance_score": 0-1相关性分数, "answer_summary": "基于匹配内容的简要回答"}}
+{{"best_match_index": 序号（1-{len(candidates)}，无相关内容返回0）, "relevance_score": 0-1相关性分数, "answer_summary": "基于匹配内容的简要回答"}}
 
 只返回JSON，不要其他内容。"""
 
@@ -1321,7 +1764,7 @@ class BidAnswerMatcher:
             ])
             
             response_text = result.get('content', '')
-            json_match = re.search(r'\{[^}]+\}', response_text, re.DOTALL)
+            json_match = _JSON_OBJECT_RE.search(response_text)
             
             if json_match:
                 match_result = json.loads(json_match.group())
@@ -1337,11 +1780,6 @@ class BidAnswerMatcher:
                     content = best_match.get('content', '')
                     answer = answer_summary if answer_summary else content
                     
-                    # 从原始内容中提取图片（答案可能是摘要，不包含图片占位符）
-                    images = self._get_images_from_content(content)
-                    if not images:
-                        images = self._get_chapter_images(best_match['chapter_id'])
-                    
                     return {
                         'answer': answer,
                         'match_type': 'semantic',
@@ -1352,7 +1790,8 @@ class BidAnswerMatcher:
                             'chapter_id': best_match.get('chapter_id'),
                             'chapter_title': best_match.get('chapter_title', ''),
                             'path': path,
-                            'images': images
+                            # 图片取自原始内容（答案可能是摘要，不包含图片占位符）
+                            'image_ids': _content_image_ids(content)
                         }
                     }
         except Exception as e:
@@ -1360,6 +1799,131 @@ class BidAnswerMatcher:
         
         return None
     
+    def _fetch_semantic_candidates(self, username: str, doc_ids: List[int] = None) -> Optional[List[Dict]]:
+        """没有向量检索结果时，按用户文档取供 LLM 判断的候选章节"""
+        conditions = ["dpr.username = %s", "dpr.status = 'completed'"]
+        params = [username]
+        
+        if doc_ids:
+            placeholders = ','.join(['%s'] * len(doc_ids))
+            conditions.append(f"c.document_id IN ({placeholders})")
+            params.extend(doc_ids)
+        
+        sql = f"""
+            SELECT c.id as chapter_id, c.document_id, c.title as chapter_title, 
+                   c.content, c.level,
+                   dpr.filename
+            FROM chapters c
+            JOIN doc_process_records dpr ON c.document_id = dpr.doc_id
+            WHERE {' AND '.join(conditions)}
+            AND c.content IS NOT NULL AND c.content != ''
+            LIMIT {self.SEMANTIC_LLM_MAX_CANDIDATES}
+        """
+        
+        try:
+            return fetch_all(sql, params)
+        except Exception as e:
+            logger.error(f"语义匹配查询失败: {e}")
+            return None
+    
+    def _vector_search(self, requirement_text: str, username: str,
+                       doc_ids: List[int] = None) -> Optional[List[Dict]]:
+        """
+        用已入库的章节向量检索与要求最相近的章节
+        
+        Returns:
+            按相似度降序、每个章节只保留最高分的 [{'chapter_id', 'similarity'}, ...]（最多 SEMANTIC_LLM_TOP_K 个）；
+            向量检索不可用时返回 None
+        """
+        try:
+            from .embedding_service import get_vector_store
+            
+            # 获取用户有权访问的文档ID；调用方指定的知识库文档只保留其中属于该用户且已处理完成的
+            sql = """
+                SELECT doc_id FROM doc_process_records 
+                WHERE username = %s AND status = 'completed'
+            """
+            docs = fetch_all(sql, (username,))
+            # 请求体中的文档ID可能是字符串，按字符串比对
+            allowed_ids = {str(d['doc_id']): d['doc_id'] for d in docs} if docs else {}
+            if doc_ids:
+                doc_ids = [allowed_ids[str(doc_id)] for doc_id in doc_ids if str(doc_id) in allowed_ids]
+            else:
+                doc_ids = list(allowed_ids.values())
+            
+            if not doc_ids:
+                return None
+            
+            results = get_vector_store().search_similar(
+                query=requirement_text,
+                document_ids=doc_ids,
+                top_k=self.SEMANTIC_LLM_TOP_K,
+                threshold=0
+            )
+        except Exception as e:
+            logger.warning(f"向量检索匹配失败，回退到LLM方式: {e}")
+            return None
+        
+        ranked = {}
+        for r in results:
+            if r.get('chapter_id') and r['chapter_id'] not in ranked:
+                ranked[r['chapter_id']] = {'chapter_id': r['chapter_id'], 'similarity': r['similarity']}
+        return list(ranked.values())
+    
+    def _fetch_chapters(self, chapter_ids: List[int], username: str) -> List[Dict]:
+        """按章节ID批量取该用户已处理完成文档中的章节（保持传入顺序）"""
+        placeholders = ','.join(['%s'] * len(chapter_ids))
+        sql = f"""
+            SELECT c.id as chapter_id, c.document_id, c.title as chapter_title,
+                   c.content, c.level, dpr.filename
+            FROM chapters c
+            JOIN doc_process_records dpr ON c.document_id = dpr.doc_id
+            WHERE c.id IN ({placeholders})
+            AND dpr.username = %s AND dpr.status = 'completed'
+            AND c.content IS NOT NULL AND c.content != ''
+            ORDER BY FIELD(c.id, {placeholders})
+        """
+        try:
+            return fetch_all(sql, chapter_ids + [username] + chapter_ids) or []
+        except Exception as e:
+            logger.error(f"语义匹配查询失败: {e}")
+            return []
+    
+    def _vector_match(self, best: Dict, username: str) -> Optional[Dict]:
+        """语义匹配 - 向量检索相似度最高且超过阈值的章节直接作为答案"""
+        sql = """
+            SELECT c.id as chapter_id, c.document_id, c.title as chapter_title,
+                   c.content, c.level, dpr.filename
+            FROM chapters c
+            JOIN doc_process_records dpr ON c.document_id = dpr.doc_id
+            WHERE c.id = %s
+            AND dpr.username = %s AND dpr.status = 'completed'
+        """
+        try:
+            best_match = fetch_one(sql, (best['chapter_id'], username))
+        except Exception as e:
+            logger.warning(f"向量检索匹配失败，回退到LLM方式: {e}")
+            return None
+        if not best_match:
+            return None
+        
+        content = best_match.get('content', '') or ''
+        path = self._get_chapter_path(best_match['chapter_id'])
+        
+        return {
+            'answer': content,
+            'match_type': 'semantic',
+            'confidence': min(best['similarity'], 1.0),
+            'source': {
+                'type': 'document',
+                'filename': best_match.get('filename', ''),
+                'chapter_id': best_match.get('chapter_id'),
+                'chapter_title': best_match.get('chapter_title', ''),
+                'path': path,
+                'image_ids': _content_image_ids(content)
+            }
+        }
+    
     def _web_search_match(self, requirement_text: str) -> Optional[Dict]:
         """网络搜索匹配"""
         if not self.web_search_service:
@@ -1464,84 +2028,137 @@ class BidAnswerMatcher:
         if not text:
             return []
         
-        # 停用词
-        stopwords = {'的', '是', '在', '有', '和', '与', '了', '这', '那', '什么', 
-                     '怎么', '如何', '为什么', '需要', '要求', '功能', '支持', '应',
-                     '能', '可以', '进行', '具有', '提供', '包括', '等', '及'}
-        
-        words = re.findall(r'[\u4e00-\u9fa5a-zA-Z0-9]+', text)
-        keywords = [w for w in words if w not in stopwords and len(w) > 1]
+        words = _WORD_RE.findall(text)
+        keywords = [w for w in words if w not in _KEYWORD_STOPWORDS and len(w) > 1]
         
         return keywords[:15]
     
-    def _clean_text(self, text: str) -> str:
-        """清理文本"""
+    @classmethod
+    def _leading_phrase(cls, text: str) -> str:
+        """要求开头的第一个短语（跳过纯数字编号，与 _clean_text 同样转小写），过短时返回空串"""
+        for word in _WORD_RE.findall(text or ''):
+            if word.isdigit():
+                continue
+            phrase = word.lower()
+            return phrase if len(phrase) >= cls.TITLE_PHRASE_MIN_LENGTH else ''
+        return ''
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=1024)
+    def _clean_text(text: str) -> str:
+        """清理文本（同一批作答中候选章节反复出现，结果按文本缓存）"""
         if not text:
             return ""
-        cleaned = re.sub(r'[^\u4e00-\u9fa5a-zA-Z0-9]', '', text)
+        cleaned = _NON_WORD_CHAR_RE.sub('', text)
         return cleaned.lower()
     
+    @staticmethod
+    @functools.lru_cache(maxsize=8192)
+    def _clean_text_prefix(text: str, length: int) -> str:
+        """
+        清理文本并只保留前 length 个字符，等价于 _clean_text(text)[:length]
+        
+        章节内容可能很长，只需清理开头足够长的一段；缓存中也只保存截断后的结果，
+        同一批作答里反复出现的候选章节不必重复清理
+        """
+        if not text:
+            return ""
+        # 清理只会删除字符，开头一段清理后够长时，就是整段清理结果的前缀
+        cleaned = _NON_WORD_CHAR_RE.sub('', text[:length * 4])
+        if len(cleaned) < length and len(text) > length * 4:
+            cleaned = _NON_WORD_CHAR_RE.sub('', text)
+        return cleaned[:length].lower()
+    
     def _get_chapter_path(self, chapter_id: int) -> List[Dict]:
-        """获取章节路径"""
-        path = []
-        current_id = chapter_id
+        """获取章节路径（从根章节到当前章节），用递归 CTE 一次查出所有祖先章节"""
+        if not chapter_id:
+            return []
         
-        while current_id:
-            try:
-                sql = "SELECT id, parent_id, level, title FROM chapters WHERE id = %s"
-                chapter = fetch_one(sql, (current_id,))
-                if chapter:
-                    path.insert(0, {
-                        'id': chapter['id'],
-                        'level': chapter['level'],
-                        'title': chapter['title']
-                    })
-                    current_id = chapter['parent_id']
-                else:
-                    break
-            except Exception:
-                break
+        sql = """
+            WITH RECURSIVE path (id, parent_id, level, title, depth) AS (
+                SELECT id, parent_id, level, title, 0
+                FROM chapters WHERE id = %s
+                UNION ALL
+                SELECT c.id, c.parent_id, c.level, c.title, p.depth + 1
+                FROM chapters c
+                JOIN path p ON c.id = p.parent_id
+            )
+            SELECT id, level, title FROM path ORDER BY depth DESC
+        """
+        try:
+            rows = fetch_all(sql, (chapter_id,))
+        except Exception as e:
+            logger.warning(f"获取章节路径失败: {e}")
+            return []
+        
+        return [
+            {
+                'id': row['id'],
+                'level': row['level'],
+                'title': row['title']
+            }
+            for row in rows
+        ]
+    
+    def resolve_source_images(self, results: List[Dict]) -> None:
+        """为一批匹配结果填充来源图片（原地将 source['image_ids'] 替换为 source['images']）
+        
+        内容中的图片占位符 {{IMAGE_ID_xxx}} 优先，没有时取章节关联的图片；
+        整批结果合并查询，而不是每条结果各查一次
+        """
+        sources = [
+            r['source'] for r in results
+            if r and r.get('source') and 'image_ids' in r['source']
+        ]
+        if not sources:
+            return
         
-        return path
+        images_by_id = self._get_images_by_ids(
+            list(dict.fromkeys(image_id for source in sources for image_id in source['image_ids']))
+        )
+        
+        pending = []
+        for source in sources:
+            source['images'] = [
+                images_by_id[image_id] for image_id in source.pop('image_ids')
+                if image_id in images_by_id
+            ]
+            if not source['images']:
+                pending.append(source)
+        
+        if pending:
+            images_by_chapter = self._get_images_by_chapters(
+                list(dict.fromkeys(source['chapter_id'] for source in pending))
+            )
+            for source in pending:
+                source['images'] = list(images_by_chapter.get(source['chapter_id'], ()))
     
-    def _get_chapter_images(self, chapter_id: int) -> List[Dict]:
-        """获取章节关联的图片"""
+    def _get_images_by_chapters(self, chapter_ids: List[int]) -> Dict[int, List[Dict]]:
+        """批量获取章节关联的图片，按章节ID分组"""
         try:
-            sql = """
-                SELECT di.id, di.image_url, di.image_path
-                FROM document_images di
-                JOIN chapter_images ci ON di.id = ci.image_id
-                WHERE ci.chapter_id = %s
-                ORDER BY ci.position_in_chapter
+            placeholders = ','.join(['%s'] * len(chapter_ids))
+            sql = f"""
+                SELECT ci.chapter_id, di.id, di.image_url, di.image_path
+                FROM chapter_images ci
+                JOIN document_images di ON di.id = ci.image_id
+                WHERE ci.chapter_id IN ({placeholders})
+                ORDER BY ci.chapter_id, ci.position_in_chapter
             """
-            images = fetch_all(sql, (chapter_id,))
-            return [
-                {
+            images_by_chapter = {}
+            for img in fetch_all(sql, chapter_ids) or []:
+                images_by_chapter.setdefault(img['chapter_id'], []).append({
                     'id': img['id'],
                     'image_url': img.get('image_url') or img.get('image_path', '')
-                }
-                for img in (images or [])
-            ]
+                })
+            return images_by_chapter
         except Exception as e:
             logger.warning(f"获取章节图片失败: {e}")
-            return []
+            return {}
     
-    def _get_images_from_content(self, content: str) -> List[Dict]:
-        """从内容中提取图片ID并获取图片信息
-        
-        内容中可能包含 {{IMAGE_ID_xxx}} 格式的占位符，
-        需要提取这些ID并从数据库获取对应的图片信息
-        """
-        if not content:
-            return []
-        
-        # 提取所有图片ID
-        image_ids = re.findall(r'\{\{IMAGE_ID_(\d+)\}\}', content)
+    def _get_images_by_ids(self, image_ids: List[int]) -> Dict[int, Dict]:
+        """按图片ID批量获取图片信息"""
         if not image_ids:
-            return []
-        
-        # 去重
-        image_ids = list(set(image_ids))
+            return {}
         
         try:
             placeholders = ','.join(['%s'] * len(image_ids))
@@ -1550,17 +2167,16 @@ class BidAnswerMatcher:
                 FROM document_images
                 WHERE id IN ({placeholders})
             """
-            images = fetch_all(sql, image_ids)
-            return [
-                {
+            return {
+                img['id']: {
                     'id': img['id'],
                     'image_url': img.get('image_url') or img.get('image_path', '')
                 }
-                for img in (images or [])
-            ]
+                for img in (fetch_all(sql, image_ids) or [])
+            }
         except Exception as e:
             logger.warning(f"从内容获取图片失败: {e}")
-            return []
+            return {}
 
 
 # ==================== Phase 4 & 5: 作答结果整合与Word生成 ====================
@@ -1622,61 +2238,85 @@ class BidAnswerGenerator:
         """
         self._init_services()
         
-        results = []
         total = len(requirements)
+        if not total:
+            return []
         
-        for i, req in enumerate(requirements):
-            try:
-                # 提取要求内容
-                req_content = req.get('content', '') or req.get('text', '')
-                spec = req.get('spec', '')
-                
-                # 组合完整的要求文本
-                full_text = req_content
-                if spec:
-                    full_text += f"\n技术规格: {spec}"
+        # 每条要求的匹配几乎全是 I/O 等待（数据库、LLM、网络搜索），用有界线程池并发执行；
+        # 工作线程不在请求上下文中，每条要求的全部查询共用一个从连接池取出的连接
+        results = [None] * total
+        completed = 0
+        max_workers = min(Config.BID_ANSWER_MAX_WORKERS, total)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(self._answer_requirement, i, req, username,
+                                knowledge_doc_ids, enable_web_search): i
+                for i, req in enumerate(requirements)
+            }
+            for future in as_completed(futures):
+                i = futures[future]
+                result, ok = future.result()
+                results[i] = result
+                completed += 1
                 
-                # 执行匹配
+                if ok and progress_callback:
+                    progress_callback(completed, total, result)
+        
+        # 来源图片在全部匹配完成后整批查询
+        self.matcher.resolve_source_images(results)
+        
+        return results
+    
+    def _answer_requirement(self, i: int, req: Dict, username: str,
+                            knowledge_doc_ids: Optional[List[int]],
+                            enable_web_search: bool) -> Tuple[Dict, bool]:
+        """处理单条技术要求，返回 (作答结果, 是否成功)"""
+        try:
+            # 提取要求内容
+            req_content = req.get('content', '') or req.get('text', '')
+            spec = req.get('spec', '')
+            
+            # 组合完整的要求文本
+            full_text = req_content
+            if spec:
+                full_text += f"\n技术规格: {spec}"
+            
+            # 执行匹配（本条要求的所有查询共用一个连接）
+            with connection_scope():
                 match_result = self.matcher.match_requirement(
                     full_text,
                     username,
                     knowledge_doc_ids,
-                    enable_web_search
+                    enable_web_search,
+                    resolve_images=False
                 )
+            
+            # 组合结果
+            return {
+                'section_number': req.get('section_number', ''),
+                'section_title': req.get('section_title', ''),
+                'requirement_index': req.get('index', i + 1),
+                'requirement': req_content,
+                'spec': spec,
+                'answer': match_result.get('answer', ''),
+                'match_type': match_result.get('match_type', 'none'),
+                'confidence': match_result.get('confidence', 0),
+                'source': match_result.get('source')
+            }, True
                 
-                # 组合结果
-                result = {
-                    'section_number': req.get('section_number', ''),
-                    'section_title': req.get('section_title', ''),
-                    'requirement_index': req.get('index', i + 1),
-                    'requirement': req_content,
-                    'spec': spec,
-                    'answer': match_result.get('answer', ''),
-                    'match_type': match_result.get('match_type', 'none'),
-                    'confidence': match_result.get('confidence', 0),
-                    'source': match_result.get('source')
-                }
-                
-                results.append(result)
-                
-                if progress_callback:
-                    progress_callback(i + 1, total, result)
-                    
-            except Exception as e:
-                logger.error(f"处理需求 {i+1} 失败: {e}")
-                results.append({
-                    'section_number': req.get('section_number', ''),
-                    'section_title': req.get('section_title', ''),
-                    'requirement_index': req.get('index', i + 1),
-                    'requirement': req.get('content', ''),
-                    'spec': req.get('spec', ''),
-                    'answer': f'处理失败: {str(e)}',
-                    'match_type': 'error',
-                    'confidence': 0,
-                    'source': None
-                })
-        
-        return results
+        except Exception as e:
+            logger.error(f"处理需求 {i+1} 失败: {e}")
+            return {
+                'section_number': req.get('section_number', ''),
+                'section_title': req.get('section_title', ''),
+                'requirement_index': req.get('index', i + 1),
+                'requirement': req.get('content', ''),
+                'spec': req.get('spec', ''),
+                'answer': f'处理失败: {str(e)}',
+                'match_type': 'error',
+                'confidence': 0,
+                'source': None
+            }, False
     
     def export_to_word(self, results: List[Dict], title: str = '招标技术要求应答书',
                        bid_doc_info: Dict = None) -> Tuple[str, str]:
@@ -1691,7 +2331,8 @@ class BidAnswerGenerator:
         Returns:
             (文件路径, 文件名)
         """
-        doc = DocumentLoader()
+        doc = _new_doc()
+        now = datetime.now()  # 文档中的生成时间与文件名使用同一时刻
         
         # 添加标题
         heading = doc.add_heading(title, 0)
@@ -1699,7 +2340,7 @@ class BidAnswerGenerator:
         
         # 添加文档信息
         info_para = doc.add_paragraph()
-        info_para.add_run(f"生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+        info_para.add_run(f"生成时间: {now.strftime('%Y-%m-%d %H:%M:%S')}\n")
         if bid_doc_info:
             info_para.add_run(f"招标文档: {bid_doc_info.get('filename', '')}\n")
         
@@ -1707,12 +2348,13 @@ class BidAnswerGenerator:
         
         # 添加统计信息
         total = len(results)
+        match_type_counts = Counter(r.get('match_type') for r in results)
         stats = {
-            'exact': sum(1 for r in results if r.get('match_type') == 'exact'),
-            'semantic': sum(1 for r in results if r.get('match_type') == 'semantic'),
-            'web': sum(1 for r in results if r.get('match_type') == 'web'),
-            'llm_generated': sum(1 for r in results if r.get('match_type') == 'llm_generated'),
-            'none': sum(1 for r in results if r.get('match_type') in ['none', 'error'])
+            'exact': match_type_counts['exact'],
+            'semantic': match_type_counts['semantic'],
+            'web': match_type_counts['web'],
+            'llm_generated': match_type_counts['llm_generated'],
+            'none': match_type_counts['none'] + match_type_counts['error']
         }
         
         stats_para = doc.add_paragraph()
@@ -1728,29 +2370,23 @@ class BidAnswerGenerator:
         doc.add_paragraph()
         doc.add_paragraph('─' * 50)
         
-        # 按章节分组
-        grouped_results = {}
-        for r in results:
-            section_num = r.get('section_number', '其他')
-            if section_num not in grouped_results:
-                grouped_results[section_num] = {
-                    'title': r.get('section_title', ''),
-                    'items': []
-                }
-            grouped_results[section_num]['items'].append(r)
+        # 应答内容中 {{IMAGE_ID_xxx}} 占位符对应的图片，整份文档一次查出
+        image_paths = self._get_image_paths(results)
         
-        # 按章节顺序输出
-        sorted_sections = sorted(grouped_results.keys(), 
-                                 key=lambda x: [int(p) if p.isdigit() else p for p in x.split('.')])
+        # 逐段直接拼装 XML 追加到 body：标题样式 ID 只解析一次（add_heading 每次都按样式名遍历样式表），
+        # 章节之间的分隔线段落只构建一次，每个章节末尾插入一份副本
+        body = doc.element.body
+        section_style_id = doc.styles['Heading 1'].style_id
+        requirement_style_id = doc.styles['Heading 2'].style_id
+        section_separator = _make_text_paragraph('─' * 30)
         
-        for section_num in sorted_sections:
-            group = grouped_results[section_num]
-            
+        # 按章节分组，按章节顺序输出
+        for section_num, section_title, items in _group_by_section(results):
             # 章节标题
-            section_heading = doc.add_heading(f"{section_num} {group['title']}", level=1)
+            _append_to_body(body, _make_text_paragraph(f"{section_num} {section_title}", section_style_id))
             
             # 每个技术要求
-            for item in group['items']:
+            for item in items:
                 req_idx = item.get('requirement_index', '')
                 requirement = item.get('requirement', '')
                 spec = item.get('spec', '')
@@ -1758,61 +2394,85 @@ class BidAnswerGenerator:
                 match_type = item.get('match_type', 'none')
                 confidence = item.get('confidence', 0)
                 
-                # 匹配类型标签
-                match_labels = {
-                    'exact': '精确匹配',
-                    'semantic': '语义匹配',
-                    'web': '网络搜索',
-                    'llm_generated': 'LLM生成',
-                    'none': '未匹配',
-                    'error': '处理失败'
-                }
-                
                 # 技术要求标题
-                req_heading = doc.add_heading(f"要求 {req_idx}", level=2)
+                _append_to_body(body, _make_text_paragraph(f"要求 {req_idx}", requirement_style_id))
                 
                 # 技术要求内容
-                req_para = doc.add_paragraph()
-                req_run = req_para.add_run("【技术要求】")
-                req_run.bold = True
-                req_para.add_run(f"\n{requirement}")
-                if spec:
-                    req_para.add_run(f"\n规格: {spec}")
+                # 要求与规格合并为一个 run，换行由 run 文本中的 \n 转为 <w:br/>
+                req_text = f"\n{requirement}\n规格: {spec}" if spec else f"\n{requirement}"
+                _add_labeled_paragraph(doc, "【技术要求】", req_text)
                 
                 # 匹配信息
-                match_para = doc.add_paragraph()
-                match_run = match_para.add_run(f"【匹配方式】{match_labels.get(match_type, '未知')} ")
-                match_run.bold = True
-                match_run.font.color.rgb = RGBColor(102, 126, 234)
-                match_para.add_run(f"(置信度: {confidence:.0%})")
+                _add_labeled_paragraph(doc, f"【匹配方式】{_MATCH_LABELS.get(match_type, '未知')} ",
+                                       f"(置信度: {confidence:.0%})", color=_MATCH_LABEL_COLOR)
                 
                 # 应答内容
-                answer_para = doc.add_paragraph()
-                answer_run = answer_para.add_run("【应答内容】")
-                answer_run.bold = True
-                answer_para.add_run(f"\n{answer}")
+                answer_para = _add_labeled_paragraph(doc, "【应答内容】")
+                self._add_answer_content(doc, answer_para, answer, image_paths)
                 
                 # 来源信息
                 source = item.get('source')
                 if source and source.get('type') == 'document':
-                    source_para = doc.add_paragraph()
-                    source_run = source_para.add_run("【来源】")
-                    source_run.bold = True
-                    source_run.font.size = Pt(10)
-                    source_para.add_run(f" {source.get('filename', '')} - {source.get('chapter_title', '')}")
+                    _add_labeled_paragraph(doc, "【来源】",
+                                           f" {source.get('filename', '')} - {source.get('chapter_title', '')}",
+                                           size=_SOURCE_LABEL_SIZE)
                 
-                doc.add_paragraph()  # 空行分隔
+                _append_to_body(body, OxmlElement('w:p'))  # 空行分隔
             
-            doc.add_paragraph('─' * 30)
+            _append_to_body(body, copy.deepcopy(section_separator))
         
         # 保存文件
-        temp_dir = tempfile.gettempdir()
-        filename = f"招标应答_{datetime.now().strftime('%Y%m%d_%H%M%S')}.docx"
-        filepath = os.path.join(temp_dir, filename)
-        doc.save(filepath)
+        filename = f"招标应答_{now.strftime('%Y%m%d_%H%M%S')}.docx"
+        filepath = _export_filepath(filename)
+        _save_docx(doc, filepath)
         
         return filepath, filename
     
+    def _get_image_paths(self, results: List[Dict]) -> Dict[int, str]:
+        """一次查询所有作答内容中图片占位符对应的图片文件路径 {图片ID: 路径}"""
+        image_ids = list(dict.fromkeys(
+            image_id for r in results for image_id in _content_image_ids(r.get('answer', ''))
+        ))
+        if not image_ids:
+            return {}
+        
+        try:
+            placeholders = ','.join(['%s'] * len(image_ids))
+            sql = f"""
+                SELECT id, image_path
+                FROM document_images
+                WHERE id IN ({placeholders})
+            """
+            return {img['id']: img.get('image_path') or '' for img in (fetch_all(sql, image_ids) or [])}
+        except Exception as e:
+            logger.warning(f"获取应答图片失败: {e}")
+            return {}
+    
+    def _add_answer_content(self, doc: DocxDocument, answer_para: Paragraph, answer: str,
+                            image_paths: Dict[int, str]):
+        """写入应答内容，{{IMAGE_ID_xxx}} 占位符替换为图片，占位符之后的文字另起段落"""
+        last_end = 0
+        for match in _IMAGE_ID_RE.finditer(answer or ''):
+            before = answer[last_end:match.start()]
+            if last_end == 0:
+                answer_para.add_run(f"\n{before}")
+            elif before.strip():
+                doc.add_paragraph(before.strip())
+            
+            img_path = image_paths.get(int(match.group(1)), '')
+            if img_path and os.path.exists(img_path):
+                try:
+                    doc.add_picture(img_path, width=Inches(5))
+                except Exception as e:
+                    logger.warning(f"添加图片失败: {img_path}, 错误: {e}")
+            
+            last_end = match.end()
+        
+        if last_end == 0:
+            answer_para.add_run(f"\n{answer}")
+        elif answer[last_end:].strip():
+            doc.add_paragraph(answer[last_end:].strip())
+    
     def export_to_word_table_format(self, results: List[Dict], title: str = '招标技术要求应答表',
                                     bid_doc_info: Dict = None) -> Tuple[str, str]:
         """
@@ -1826,7 +2486,8 @@ class BidAnswerGenerator:
         Returns:
             (文件路径, 文件名)
         """
-        doc = DocumentLoader()
+        doc = _new_doc()
+        now = datetime.now()  # 文档中的生成时间与文件名使用同一时刻
         
         # 添加标题
         heading = doc.add_heading(title, 0)
@@ -1835,86 +2496,90 @@ class BidAnswerGenerator:
         # 添加时间和来源
         info_para = doc.add_paragraph()
         info_para.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        info_para.add_run(f"生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        info_para.add_run(f"生成时间: {now.strftime('%Y-%m-%d %H:%M:%S')}")
         if bid_doc_info:
             info_para.add_run(f"\n招标文档: {bid_doc_info.get('filename', '')}")
         
         doc.add_paragraph()
         
-        # 按章节分组创建表格
-        grouped_results = {}
-        for r in results:
-            section_num = r.get('section_number', '其他')
-            if section_num not in grouped_results:
-                grouped_results[section_num] = {
-                    'title': r.get('section_title', ''),
-                    'items': []
-                }
-            grouped_results[section_num]['items'].append(r)
-        
-        sorted_sections = sorted(grouped_results.keys(),
-                                 key=lambda x: [int(p) if p.isdigit() else p for p in x.split('.')])
-        
-        for section_num in sorted_sections:
-            group = grouped_results[section_num]
-            
+        # 按章节分组创建表格（表格只含表头，数据行 {<w:tbl>: 行生成器} 在保存时写出）
+        streamed_rows = {}
+        for section_num, section_title, items in _group_by_section(results):
             # 章节标题
-            doc.add_heading(f"{section_num} {group['title']}", level=1)
+            doc.add_heading(f"{section_num} {section_title}", level=1)
             
             # 创建表格
-            table = doc.add_table(rows=1, cols=4)
+            table = doc.add_table(rows=0, cols=len(_ANSWER_TABLE_HEADERS))
             table.style = 'Table Grid'
+            tbl = table._tbl
+            tc_templates = _table_cell_templates(tbl)
             
-            # 表头
-            header_cells = table.rows[0].cells
-            headers = ['序号', '技术要求', '应答内容', '匹配方式']
-            for i, header in enumerate(headers):
-                header_cells[i].text = header
-                header_cells[i].paragraphs[0].runs[0].bold = True
+            # 表头：与数据行一样直接拼装 <w:tr>，不经过 cells/paragraphs/runs 逐层取值
+            tbl.append(_make_table_row(tc_templates, _ANSWER_TABLE_HEADERS, bold=True))
             
-            # 数据行
-            for item in group['items']:
-                row_cells = table.add_row().cells
-                
-                row_cells[0].text = str(item.get('requirement_index', ''))
-                row_cells[1].text = item.get('requirement', '')
-                if item.get('spec'):
-                    row_cells[1].text += f"\n规格: {item['spec']}"
-                row_cells[2].text = item.get('answer', '')
-                
-                match_labels = {
-                    'exact': '精确匹配',
-                    'semantic': '语义匹配',
-                    'web': '网络搜索',
-                    'llm_generated': 'LLM生成',
-                    'none': '未匹配',
-                    'error': '失败'
-                }
-                row_cells[3].text = match_labels.get(item.get('match_type', 'none'), '未知')
+            # 数据行在保存时逐行生成并直接写入文件，不在内存中构建整张表
+            streamed_rows[tbl] = _iter_answer_table_rows(tc_templates, items)
             
             doc.add_paragraph()
         
         # 保存文件
-        temp_dir = tempfile.gettempdir()
-        filename = f"招标应答表_{datetime.now().strftime('%Y%m%d_%H%M%S')}.docx"
-        filepath = os.path.join(temp_dir, filename)
-        doc.save(filepath)
+        filename = f"招标应答表_{now.strftime('%Y%m%d_%H%M%S')}.docx"
+        filepath = _export_filepath(filename)
+        _save_docx(doc, filepath, streamed_rows)
         
         return filepath, filename
 
 
 # ==================== 便捷函数 ====================
 
+# 已解析的招标文档 {绝对路径: ((修改时间, 文件大小), BidDocumentParser)}，按最近使用排序
+_parsed_documents: "OrderedDict[str, Tuple[Tuple[int, int], BidDocumentParser]]" = OrderedDict()
+_parsed_documents_lock = threading.Lock()
+
+
+def load_bid_document(file_path: str) -> BidDocumentParser:
+    """
+    返回已解析文档结构的 BidDocumentParser
+    
+    同一文件（路径、修改时间、大小均未变化）复用进程内缓存的解析结果，文件被替换后自动重新解析；
+    返回的解析器在请求/线程间共享，调用方只能读取，不能修改其中的章节结构
+    """
+    path = os.path.abspath(file_path)
+    stat = os.stat(path)
+    version = (stat.st_mtime_ns, stat.st_size)
+    with _parsed_documents_lock:
+        cached = _parsed_documents.get(path)
+        if cached and cached[0] == version:
+            _parsed_documents.move_to_end(path)
+            return cached[1]
+    
+    # 解析在锁外进行，不阻塞其他文档的读取
+    parser = BidDocumentParser(path)
+    parser.parse_document_structure()
+    parser.doc = None  # 章节结构不引用 python-docx 对象，缓存中不保留整棵文档树
+    
+    with _parsed_documents_lock:
+        _parsed_documents[path] = (version, parser)
+        _parsed_documents.move_to_end(path)
+        while len(_parsed_documents) > Config.BID_PARSED_DOCUMENT_CACHE_SIZE:
+            _parsed_documents.popitem(last=False)
+    return parser
+
+
 def parse_bid_document(file_path: str) -> Dict:
-    """解析招标文档"""
-    parser = BidDocumentParser(file_path)
-    return parser.parse_document_structure()
+    """解析招标文档（返回缓存共享的章节结构，只读）"""
+    return load_bid_document(file_path).document_structure
+
+
+@functools.lru_cache(maxsize=256)
+def _parse_user_instruction_cached(instruction: str) -> Dict:
+    return UserInstructionParser().parse_instruction(instruction)
 
 
 def parse_user_instruction(instruction: str) -> Dict:
-    """解析用户指令"""
-    parser = UserInstructionParser()
-    return parser.parse_instruction(instruction)
+    """解析用户指令（相同指令复用解析结果，返回副本供调用方修改）"""
+    result = _parse_user_instruction_cached(instruction)
+    return {**result, 'section_numbers': list(result['section_numbers'])}
 
 
 def process_bid_response(instruction: str, file_path: str = None, doc_id: int = None) -> Dict:
@@ -1964,3 +2629,53 @@ def export_bid_answers_to_word(results: List[Dict], title: str = '招标技术
         return generator.export_to_word_table_format(results, title, bid_doc_info)
     else:
         return generator.export_to_word(results, title, bid_doc_info)
+
+
+@celery.task(name='bid.export_word', ignore_result=False)
+def export_bid_answers_task(results: List[Dict], title: str = '招标技术要求应答书',
+                            bid_doc_info: Dict = None, format_type: str = 'default') -> Dict:
+    """
+    Celery 任务：导出招标作答结果为Word文档，避免大批量结果在请求内同步生成超时
+    
+    Returns:
+        {'filepath': 文件路径（位于 Config.BID_EXPORT_FOLDER）, 'filename': 下载文件名}
+    """
+    filepath, filename = export_bid_answers_to_word(results, title, bid_doc_info, format_type)
+    return {'filepath': filepath, 'filename': filename}
+
+
+@celery.task(name='bid.answer_batch', ignore_result=False)
+def answer_bid_requirements_batch_task(requirements: List[Dict], username: str,
+                                       knowledge_doc_ids: List[int] = None,
+                                       llm_config_id: int = None,
+                                       enable_web_search: bool = True) -> List[Dict]:
+    """Celery 任务：作答一批技术要求（answer_bid_requirements_async 拆分出的子任务）"""
+    return answer_bid_requirements(requirements, username, knowledge_doc_ids, llm_config_id, enable_web_search)
+
+
+@celery.task(name='bid.merge_answer_batches', ignore_result=False)
+def merge_bid_answer_batches_task(batches: List[List[Dict]]) -> List[Dict]:
+    """Celery 任务：按提交顺序合并各批次的作答结果"""
+    return [result for batch in batches for result in batch]
+
+
+def answer_bid_requirements_async(requirements: List[Dict], username: str,
+                                  knowledge_doc_ids: List[int] = None,
+                                  llm_config_id: int = None,
+                                  enable_web_search: bool = True) -> str:
+    """
+    异步批量作答：技术要求按 Config.BID_ANSWER_BATCH_SIZE 条一批拆成并行的 Celery 子任务，
+    全部完成后由 merge_bid_answer_batches_task 合并
+    
+    Returns:
+        合并任务的 task_id，通过 merge_bid_answer_batches_task.AsyncResult(task_id) 查询结果
+    """
+    # 未带序号的要求按整体位置补上序号，与不分批时的 requirement_index 一致
+    numbered = [req if 'index' in req else {**req, 'index': n + 1} for n, req in enumerate(requirements)]
+    batch_size = Config.BID_ANSWER_BATCH_SIZE
+    header = group(
+        answer_bid_requirements_batch_task.s(numbered[start:start + batch_size], username,
+                                             knowledge_doc_ids, llm_config_id, enable_web_search)
+        for start in range(0, len(numbered), batch_size)
+    )
+    return chord(header)(merge_bid_answer_batches_task.s()).id
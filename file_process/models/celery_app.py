@@ -1,9 +1,4 @@
 from celery import Celery
-import sys
-import os
-
-# 添加父目录到路径，以便导入统一配置
-sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))))
 from config.app_config import Config
 
 # 创建 celery 实例
@@ -12,11 +7,20 @@ celery = Celery('file_process')
 # 配置 - 使用统一配置
 celery.conf.update(
     broker_url=Config.get_redis_uri(),
-    result_backend=Config.get_mysql_celery_uri(),
-    broker_transport_options={
-        'visibility_timeout': 3600,
-        'max_connections': Config.REDIS_POOL_MAX_CONNECTIONS,
-    }
+    result_backend=Config.get_redis_result_uri(),
+    result_expires=Config.CELERY_RESULT_EXPIRES,
+    # 默认不保存任务结果，需要查询状态/结果的任务单独声明 ignore_result=False
+    task_ignore_result=True,
+    broker_transport_options=Config.get_celery_broker_transport_options(),
+    broker_pool_limit=Config.REDIS_POOL_MAX_CONNECTIONS,
+    # 任务多为耗时的文档处理、分片合并和导出，每个 worker 进程只预取一条，避免短任务排在长任务之后
+    worker_prefetch_multiplier=1,
+    # 任务参数与结果都是基础类型，用 msgpack 序列化；同时接受 json，升级前已入队的消息仍可消费
+    task_serializer='msgpack',
+    result_serializer='msgpack',
+    accept_content=['msgpack', 'json'],
+    # 导出任务的参数包含全部作答结果（大段中文文本），压缩后再写入 broker
+    task_compression='gzip',
 )
 
 # 手动导入任务模块，确保任务被注册
@@ -24,12 +28,14 @@ try:
     from . import fileupload
     from . import prodetail
     from . import word_parser
+    from . import bid_document_parser
 except ImportError:
     # 如果相对导入失败，尝试绝对导入
     try:
         from file_process.models import fileupload
         from file_process.models import prodetail
         from file_process.models import word_parser
+        from file_process.models import bid_document_parser
     except ImportError:
         pass  # 任务会在运行时动态导入
 
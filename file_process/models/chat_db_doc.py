@@ -2,19 +2,41 @@
 文档对话模块 - 支持精准匹配和LLM匹配
 """
 import os
+import io
 import re
 import json
-import tempfile
+import functools
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from itertools import accumulate
 from flask import Blueprint, request, jsonify, render_template, session, send_file
-from config.db_config import fetch_one, fetch_all, dml_sql
+from config.app_config import Config
+from config.db_config import connection_scope, fetch_one, fetch_all, fetch_all_cached, dml_sql
 from config.logging_config import logger
+from extensions import redis_client
 
 chatdoc = Blueprint('chatdoc', __name__)
 
 # 获取基础目录
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
+# 模糊匹配时需要去掉的字符：除中文、英文、数字以外的所有字符
+_FUZZY_STRIP_RE = re.compile(r'[^\u4e00-\u9fa5a-zA-Z0-9]')
+
+# 批量模糊匹配时拼接语料用的分隔符，清理时保留
+_FUZZY_SEPARATOR = '\x1f'
+_FUZZY_CORPUS_STRIP_RE = re.compile(r'[^\u4e00-\u9fa5a-zA-Z0-9\x1f]')
+
+# 可以走全文索引短语检索的精确查询：至少两个字的纯中文
+# ngram 分词（ngram_token_size=2）下，这类查询的每个分词都不会被英文停用词剔除，
+# 内容中包含该查询时必然命中对应短语，用索引预筛不会漏掉结果
+_FULLTEXT_PHRASE_RE = re.compile(r'[\u4e00-\u9fa5]{2,}')
+
+# 导出 Word：章节内容中的 [表格]...[/表格] 块和图片占位符 {{IMAGE_ID_xxx}}
+_TABLE_BLOCK_RE = re.compile(r'\[表格\](.*?)\[/表格\]', re.DOTALL)
+_IMAGE_ID_RE = re.compile(r'\{\{IMAGE_ID_(\d+)\}\}')
+
 
 def clean_text_for_fuzzy(text):
     """
@@ -23,41 +45,120 @@ def clean_text_for_fuzzy(text):
     if not text:
         return ""
     # 去掉所有标点符号和特殊字符，只保留中文、英文、数字
-    cleaned = re.sub(r'[^\u4e00-\u9fa5a-zA-Z0-9]', '', text)
-    return cleaned.lower()
+    return _FUZZY_STRIP_RE.sub('', text).lower()
+
+
+def _find_fuzzy_matches(cleaned_query, texts):
+    """
+    在多段文本中查找清理后包含 cleaned_query 的文本
+    
+    所有文本用分隔符拼成一个语料，一次正则清理后在整个语料上逐个定位命中，
+    按各段起始偏移映射回文本下标；分隔符清理后保留且不会出现在查询中，命中不会跨段。
+    清理后的语料只剩中文、英文和数字，忽略大小写查找与逐条 lower() 后再比较等价，
+    省去对整个语料做一次 lower()
+    
+    Returns:
+        命中文本的下标集合
+    """
+    if not texts:
+        return set()
+    
+    corpus = _FUZZY_CORPUS_STRIP_RE.sub('', _FUZZY_SEPARATOR.join(t or '' for t in texts))
+    segments = corpus.split(_FUZZY_SEPARATOR)
+    if len(segments) != len(texts):
+        # 原文本中自带分隔符时无法按段对齐，退回逐条匹配
+        return {i for i, t in enumerate(texts) if cleaned_query in clean_text_for_fuzzy(t)}
+    
+    # starts[i] 为第 i 段在语料中的起始偏移
+    starts = list(accumulate((len(segment) + 1 for segment in segments), initial=0))
+    pattern = re.compile(re.escape(cleaned_query), re.IGNORECASE)
+    matched = set()
+    match = pattern.search(corpus)
+    while match:
+        index = bisect_right(starts, match.start()) - 1
+        matched.add(index)
+        # 同一段只记一次，直接跳到下一段开头继续查找
+        match = pattern.search(corpus, starts[index + 1])
+    return matched
 
 
 def get_chapter_with_children(chapter_id, document_id):
     """
-    获取章节及其所有子章节（递归）
+    获取章节及其所有子章节（先序排列：章节本身在前，各子章节按 order_index 依次展开）
+    """
+    return get_chapters_with_children([chapter_id], document_id).get(chapter_id, [])
+
+
+def get_chapters_with_children(chapter_ids, document_id=None):
     """
-    result = []
+    批量获取多个章节各自的子树（先序排列：章节本身在前，各子章节按 order_index 依次展开）
     
-    # 获取当前章节
-    chapter_sql = """
-        SELECT c.id, c.document_id, c.parent_id, c.level, c.order_index, 
-               c.title, c.content, c.style_name, c.font_size, c.is_bold, c.paragraph_index
-        FROM chapters c
-        WHERE c.id = %s AND c.document_id = %s
+    用递归 CTE 一次查出所有子树，root_id 列记录每行所属的起始章节；
+    图片按章节批量查询，再在内存中按父子关系排出顺序
+    
+    Args:
+        chapter_ids: 起始章节ID列表
+        document_id: 指定时只返回属于该文档的起始章节
+    
+    Returns:
+        {起始章节ID: [章节, ...]}，不存在的章节不出现在结果中
     """
-    chapter = fetch_one(chapter_sql, (chapter_id, document_id))
-    if chapter:
-        # 获取章节关联的图片
-        images = get_chapter_images(chapter_id)
-        chapter['images'] = images
-        result.append(chapter)
-        
-        # 递归获取子章节
-        children_sql = """
-            SELECT id FROM chapters 
-            WHERE parent_id = %s AND document_id = %s
-            ORDER BY order_index
-        """
-        children = fetch_all(children_sql, (chapter_id, document_id))
-        for child in children:
-            result.extend(get_chapter_with_children(child['id'], document_id))
+    chapter_ids = list(dict.fromkeys(cid for cid in chapter_ids if cid))
+    if not chapter_ids:
+        return {}
+    
+    placeholders = ','.join(['%s'] * len(chapter_ids))
+    params = list(chapter_ids)
+    document_filter = ''
+    if document_id is not None:
+        document_filter = ' AND c.document_id = %s'
+        params.append(document_id)
     
-    return result
+    sql = f"""
+        WITH RECURSIVE subtree AS (
+            SELECT c.id, c.document_id, c.parent_id, c.level, c.order_index,
+                   c.title, c.content, c.style_name, c.font_size, c.is_bold, c.paragraph_index,
+                   c.id AS root_id, 0 AS depth
+            FROM chapters c
+            WHERE c.id IN ({placeholders}){document_filter}
+            UNION ALL
+            SELECT c.id, c.document_id, c.parent_id, c.level, c.order_index,
+                   c.title, c.content, c.style_name, c.font_size, c.is_bold, c.paragraph_index,
+                   s.root_id, s.depth + 1
+            FROM chapters c
+            JOIN subtree s ON c.parent_id = s.id
+            WHERE c.document_id = s.document_id
+        )
+        SELECT * FROM subtree ORDER BY order_index
+    """
+    rows = fetch_all(sql, params)
+    if not rows:
+        return {}
+    
+    images_by_chapter = get_images_by_chapters(list({row['id'] for row in rows}))
+    
+    roots = {}
+    children_by_parent = {}
+    for row in rows:
+        row['images'] = images_by_chapter.get(row['id'], [])
+        root_id = row.pop('root_id')
+        if row.pop('depth') == 0:
+            roots[root_id] = row
+        else:
+            children_by_parent.setdefault((root_id, row['parent_id']), []).append(row)
+    
+    # 先序遍历：子章节逆序压栈，出栈时即为 order_index 顺序
+    subtrees = {}
+    for root_id, root in roots.items():
+        result = []
+        stack = [root]
+        while stack:
+            chapter = stack.pop()
+            result.append(chapter)
+            stack.extend(reversed(children_by_parent.get((root_id, chapter['id']), [])))
+        subtrees[root_id] = result
+    
+    return subtrees
 
 
 def get_chapter_path(chapter_id):
@@ -65,27 +166,44 @@ def get_chapter_path(chapter_id):
     获取章节的完整层级路径（从根到当前章节）
     返回路径列表，每个元素包含 id, level, title
     """
-    path = []
-    current_id = chapter_id
+    if not chapter_id:
+        return []
+    return get_chapter_paths([chapter_id]).get(chapter_id, [])
+
+
+def get_chapter_paths(chapter_ids):
+    """
+    批量获取多个章节的完整层级路径，用递归 CTE 一次查出所有祖先章节
     
-    while current_id:
-        sql = """
-            SELECT id, parent_id, level, title
-            FROM chapters
-            WHERE id = %s
-        """
-        chapter = fetch_one(sql, (current_id,))
-        if chapter:
-            path.insert(0, {
-                'id': chapter['id'],
-                'level': chapter['level'],
-                'title': chapter['title']
-            })
-            current_id = chapter['parent_id']
-        else:
-            break
+    seed_id 列记录每行所属的起始章节，便于按起始章节分组
+    
+    Returns:
+        {章节ID: [{id, level, title}, ...]}，每条路径从根到该章节
+    """
+    chapter_ids = list(dict.fromkeys(cid for cid in chapter_ids if cid))
+    if not chapter_ids:
+        return {}
     
-    return path
+    placeholders = ','.join(['%s'] * len(chapter_ids))
+    sql = f"""
+        WITH RECURSIVE path (seed_id, id, parent_id, level, title, depth) AS (
+            SELECT id, id, parent_id, level, title, 0
+            FROM chapters WHERE id IN ({placeholders})
+            UNION ALL
+            SELECT p.seed_id, c.id, c.parent_id, c.level, c.title, p.depth + 1
+            FROM chapters c
+            JOIN path p ON c.id = p.parent_id
+        )
+        SELECT seed_id, id, level, title FROM path ORDER BY seed_id, depth DESC
+    """
+    paths = {}
+    for row in fetch_all(sql, chapter_ids):
+        paths.setdefault(row['seed_id'], []).append({
+            'id': row['id'],
+            'level': row['level'],
+            'title': row['title']
+        })
+    return paths
 
 
 def get_chapter_images(chapter_id):
@@ -102,6 +220,62 @@ def get_chapter_images(chapter_id):
     return fetch_all(sql, (chapter_id,))
 
 
+def get_images_by_chapters(chapter_ids):
+    """
+    批量获取多个章节关联的图片，一次查询
+    
+    Returns:
+        {章节ID: [图片, ...]}，每个章节内按图片在章节中的位置排序
+    """
+    if not chapter_ids:
+        return {}
+    
+    placeholders = ','.join(['%s'] * len(chapter_ids))
+    sql = f"""
+        SELECT ci.chapter_id, di.id, di.image_name, di.image_path, di.image_url, di.image_type
+        FROM document_images di
+        INNER JOIN chapter_images ci ON di.id = ci.image_id
+        WHERE ci.chapter_id IN ({placeholders})
+        ORDER BY ci.chapter_id, ci.position_in_chapter
+    """
+    images_by_chapter = {}
+    for image in fetch_all(sql, list(chapter_ids)):
+        images_by_chapter.setdefault(image.pop('chapter_id'), []).append(image)
+    return images_by_chapter
+
+
+def _assign_chapter_numbers(chapters):
+    """
+    根据树形结构（parent_id, level, order_index）为章节生成编号（如 1.4.1, 1.4.2）
+    
+    会在每个章节上写入 '_number'
+    
+    Returns:
+        dict: {章节编号: 章节数据}
+    """
+    # 构建 parent_id -> children 映射（根章节挂在 None 下）
+    # 先整体按 order_index 稳定排序一次，各父章节下的子章节自然有序，无需逐个排序
+    children_map = {}
+    for c in sorted(chapters, key=lambda x: x['order_index']):
+        children_map.setdefault(c['parent_id'], []).append(c)
+    
+    # 用显式栈先序生成编号，子章节逆序压栈，出栈时即为 order_index 顺序
+    number_index = {}
+    roots = children_map.get(None, [])
+    stack = [(str(idx), roots[idx - 1]) for idx in range(len(roots), 0, -1)]
+    while stack:
+        number, chapter = stack.pop()
+        chapter['_number'] = number
+        number_index[number] = chapter
+        
+        children = children_map.get(chapter['id'])
+        if children:
+            prefix = number + '.'
+            stack.extend([(prefix + str(idx), children[idx - 1]) for idx in range(len(children), 0, -1)])
+    
+    return number_index
+
+
 def build_chapter_number_index(document_id):
     """
     从数据库构建章节编号索引
@@ -126,50 +300,34 @@ def build_chapter_number_index(document_id):
     if not chapters:
         return {}
     
-    # 构建 id -> chapter 映射
-    id_to_chapter = {c['id']: c for c in chapters}
-    
-    # 构建 parent_id -> children 映射
-    children_map = {}
-    root_chapters = []
-    for c in chapters:
-        parent_id = c['parent_id']
-        if parent_id is None:
-            root_chapters.append(c)
-        else:
-            if parent_id not in children_map:
-                children_map[parent_id] = []
-            children_map[parent_id].append(c)
-    
-    # 对每个层级的子章节按 order_index 排序
-    for parent_id in children_map:
-        children_map[parent_id].sort(key=lambda x: x['order_index'])
-    root_chapters.sort(key=lambda x: x['order_index'])
-    
-    # 递归生成编号
-    number_index = {}
-    
-    def assign_numbers(chapter_list, prefix=''):
-        for idx, chapter in enumerate(chapter_list, 1):
-            if prefix:
-                number = f"{prefix}.{idx}"
-            else:
-                number = str(idx)
-            
-            chapter['_number'] = number
-            number_index[number] = chapter
-            
-            # 递归处理子章节
-            children = children_map.get(chapter['id'], [])
-            if children:
-                assign_numbers(children, number)
-    
-    assign_numbers(root_chapters)
+    number_index = _assign_chapter_numbers(chapters)
     
     logger.info(f"文档 {document_id} 构建章节索引完成，共 {len(number_index)} 个章节")
     return number_index
 
 
+@functools.lru_cache(maxsize=256)
+def _cached_chapter_number_ids(document_id, chapter_count, max_chapter_id):
+    """
+    缓存文档的章节编号 -> 章节ID 映射
+    
+    chapter_count 和 max_chapter_id 作为版本号参与缓存键：章节树只会通过重新解析
+    （删除后重新插入）或新增章节改变，两者都会让版本号变化，旧缓存自然失效。
+    只缓存树结构，章节内容每次按ID查询，内容更新无需失效缓存
+    
+    Returns:
+        dict: {章节编号: 章节ID}，调用方不得修改
+    """
+    sql = """
+        SELECT id, parent_id, level, order_index
+        FROM chapters
+        WHERE document_id = %s
+        ORDER BY level, order_index
+    """
+    chapters = fetch_all(sql, (document_id,))
+    return {number: chapter['id'] for number, chapter in _assign_chapter_numbers(chapters).items()}
+
+
 def get_chapter_by_number_from_db(document_id, section_number):
     """
     从数据库获取指定编号的章节
@@ -181,8 +339,74 @@ def get_chapter_by_number_from_db(document_id, section_number):
     Returns:
         章节数据或 None
     """
-    number_index = build_chapter_number_index(document_id)
-    return number_index.get(section_number)
+    version = fetch_one(
+        "SELECT COUNT(*) AS chapter_count, MAX(id) AS max_chapter_id FROM chapters WHERE document_id = %s",
+        (document_id,)
+    )
+    if not version or not version['chapter_count']:
+        return None
+    
+    number_ids = _cached_chapter_number_ids(document_id, version['chapter_count'], version['max_chapter_id'])
+    chapter_id = number_ids.get(section_number)
+    if chapter_id is None:
+        return None
+    
+    chapter = fetch_one(
+        "SELECT id, parent_id, level, order_index, title, content FROM chapters WHERE id = %s",
+        (chapter_id,)
+    )
+    if chapter:
+        chapter['_number'] = section_number
+    return chapter
+
+
+def _search_chapters_exact_fulltext(query, document_ids=None):
+    """
+    用 chapters(title, content) 上的 FULLTEXT 索引（见 scripts/add_chapters_fulltext.sql）执行内容精确匹配
+    
+    标题相等和内容包含分成两段 UNION：OR 条件会让 MySQL 放弃全文索引。
+    全文短语检索只作为索引预筛，结果仍由 LIKE 校验，与逐行 LIKE 的结果一致
+    
+    Returns:
+        章节列表；查询不适合全文检索或索引不存在导致查询失败时返回 None，由调用方回退到 LIKE
+    """
+    if not _FULLTEXT_PHRASE_RE.fullmatch(query):
+        return None
+    
+    doc_filter = ''
+    doc_params = []
+    if document_ids:
+        doc_filter = f" AND c.document_id IN ({','.join(['%s'] * len(document_ids))})"
+        doc_params = list(document_ids)
+    
+    columns = """
+        c.id, c.document_id, c.parent_id, c.level, c.order_index,
+        c.title, c.content, c.style_name, c.font_size, c.is_bold, c.paragraph_index,
+        dpr.filename as doc_filename,
+        CASE WHEN c.title = %s THEN 'title' ELSE 'content' END as match_field
+    """
+    sql = f"""
+        SELECT * FROM (
+            SELECT {columns}
+            FROM chapters c
+            LEFT JOIN doc_process_records dpr ON c.document_id = dpr.doc_id
+            WHERE c.title = %s{doc_filter}
+            UNION
+            SELECT {columns}
+            FROM chapters c
+            LEFT JOIN doc_process_records dpr ON c.document_id = dpr.doc_id
+            WHERE MATCH(c.title, c.content) AGAINST (%s IN BOOLEAN MODE)
+            AND c.content LIKE %s{doc_filter}
+        ) hits
+        ORDER BY document_id, level, order_index
+    """
+    params = ([query, query] + doc_params
+              + [query, f'"{query}"', f'%{query}%'] + doc_params)
+    try:
+        return fetch_all(sql, params)
+    except Exception as e:
+        logger.warning(f"内容精确匹配全文检索失败，回退到 LIKE 查询: {e}")
+        return None
 
 
 def search_chapters_exact(query, document_ids=None, search_scope='title'):
@@ -195,7 +419,11 @@ def search_chapters_exact(query, document_ids=None, search_scope='title'):
         search_scope: 搜索范围 - 'title'(只匹配标题) 或 'content'(匹配标题和内容)
     """
     if search_scope == 'content':
-        # 同时匹配 title 和 content
+        # 同时匹配 title 和 content，优先走全文索引
+        chapters = _search_chapters_exact_fulltext(query, document_ids)
+        if chapters is not None:
+            return chapters
+        
         if document_ids:
             placeholders = ','.join(['%s'] * len(document_ids))
             sql = f"""
@@ -291,28 +519,75 @@ def search_chapters_fuzzy(query, document_ids=None, search_scope='title'):
         chapters = fetch_all(sql)
     
     # 根据搜索范围进行匹配
+    title_matched = _find_fuzzy_matches(cleaned_query, [chapter.get('title') for chapter in chapters])
+    content_matched = set()
+    if search_scope == 'content':
+        # 同时匹配 title 和 content，标题命中的章节不再匹配内容
+        rest = [i for i in range(len(chapters)) if i not in title_matched]
+        hits = _find_fuzzy_matches(cleaned_query, [chapters[i].get('content') for i in rest])
+        content_matched = {rest[i] for i in hits}
+    
     results = []
-    for chapter in chapters:
-        cleaned_title = clean_text_for_fuzzy(chapter.get('title', ''))
-        
-        if search_scope == 'content':
-            # 同时匹配 title 和 content
-            cleaned_content = clean_text_for_fuzzy(chapter.get('content', ''))
-            if cleaned_query in cleaned_title:
-                chapter['match_field'] = 'title'
-                results.append(chapter)
-            elif cleaned_query in cleaned_content:
-                chapter['match_field'] = 'content'
-                results.append(chapter)
-        else:
-            # 只匹配 title
-            if cleaned_query in cleaned_title:
-                chapter['match_field'] = 'title'
-                results.append(chapter)
+    for i, chapter in enumerate(chapters):
+        if i in title_matched:
+            chapter['match_field'] = 'title'
+            results.append(chapter)
+        elif i in content_matched:
+            chapter['match_field'] = 'content'
+            results.append(chapter)
     
     return results
 
 
+def _attach_chapter_details(chapters, include_children, document_id=None):
+    """
+    批量补全搜索命中章节的层级路径、图片和子章节（原地修改并返回 chapters）
+    
+    Args:
+        chapters: 搜索命中的章节列表
+        include_children: 是否包含子章节
+        document_id: 可选，章节所属文档，用于限定子章节查询范围
+    """
+    chapter_ids = [chapter['id'] for chapter in chapters]
+    paths = get_chapter_paths(chapter_ids)
+    images_by_chapter = get_images_by_chapters(chapter_ids)
+    subtrees = get_chapters_with_children(chapter_ids, document_id) if include_children else {}
+    
+    for chapter in chapters:
+        # 获取章节的层级路径
+        chapter['path'] = paths.get(chapter['id'], [])
+        
+        # 获取章节图片
+        chapter['images'] = images_by_chapter.get(chapter['id'], [])
+        
+        # 如果需要包含子章节
+        if include_children:
+            children = subtrees.get(chapter['id'], [])
+            # 去掉第一个（当前章节本身，避免重复）
+            if len(children) > 1:
+                chapter['children'] = children[1:]
+    
+    return chapters
+
+
+def _group_chapters_by_document(chapters, include_children):
+    """
+    补全命中章节的详细信息后按文档分组，返回 [{'document_id', 'filename', 'chapters'}, ...]
+    """
+    doc_results = {}
+    for chapter in _attach_chapter_details(chapters, include_children):
+        doc_id = chapter['document_id']
+        if doc_id not in doc_results:
+            doc_results[doc_id] = {
+                'document_id': doc_id,
+                'filename': chapter.get('doc_filename', '未知文档'),
+                'chapters': []
+            }
+        doc_results[doc_id]['chapters'].append(chapter)
+    
+    return list(doc_results.values())
+
+
 @chatdoc.route('/chatdoc', methods=['GET', 'POST'])
 def chat_page():
     """渲染文档对话页面"""
@@ -332,7 +607,7 @@ def get_available_documents():
             WHERE username = %s AND status = 'completed'
             ORDER BY created_at DESC
         """
-        documents = fetch_all(sql, (username,))
+        documents = fetch_all_cached(sql, (username,))
         
         return jsonify({
             'success': True,
@@ -385,32 +660,8 @@ def search_content():
                 }
             })
         
-        # 按文档分组
-        doc_results = {}
-        for chapter in chapters:
-            doc_id = chapter['document_id']
-            if doc_id not in doc_results:
-                doc_results[doc_id] = {
-                    'document_id': doc_id,
-                    'filename': chapter.get('doc_filename', '未知文档'),
-                    'chapters': []
-                }
-            
-            # 获取章节的层级路径
-            chapter['path'] = get_chapter_path(chapter['id'])
-            
-            # 获取章节图片
-            images = get_chapter_images(chapter['id'])
-            chapter['images'] = images
-            
-            # 如果需要包含子章节
-            if include_children:
-                children = get_chapter_with_children(chapter['id'], doc_id)
-                # 去掉第一个（当前章节本身，避免重复）
-                if len(children) > 1:
-                    chapter['children'] = children[1:]
-            
-            doc_results[doc_id]['chapters'].append(chapter)
+        # 补全路径、图片和子章节后按文档分组
+        doc_results = _group_chapters_by_document(chapters, include_children)
         
         return jsonify({
             'success': True,
@@ -418,7 +669,7 @@ def search_content():
                 'query': query,
                 'match_type': match_type,
                 'search_scope': search_scope,
-                'results': list(doc_results.values()),
+                'results': doc_results,
                 'total_matches': len(chapters),
                 'document_count': len(doc_results)
             }
@@ -432,6 +683,27 @@ def search_content():
         }), 500
 
 
+def _batch_search_one(query, match_type, document_ids, search_scope, include_children):
+    """
+    批量搜索中的单条查询：搜索章节并按文档分组，在线程池中执行
+    """
+    with connection_scope():
+        # 根据匹配类型搜索
+        if match_type == 'exact':
+            chapters = search_chapters_exact(query, document_ids if document_ids else None, search_scope)
+        else:
+            chapters = search_chapters_fuzzy(query, document_ids if document_ids else None, search_scope)
+        
+        # 补全路径、图片和子章节后按文档分组
+        doc_results = _group_chapters_by_document(chapters, include_children)
+        
+        return {
+            'query': query,
+            'results': doc_results,
+            'match_count': len(chapters)
+        }
+
+
 @chatdoc.route('/api/chat/batch-search', methods=['POST'])
 def batch_search():
     """
@@ -452,50 +724,18 @@ def batch_search():
                 'error': '查询内容不能为空'
             }), 400
         
-        all_results = []
+        stripped_queries = [query.strip() for query in queries if query.strip()]
         
-        for query in queries:
-            query = query.strip()
-            if not query:
-                continue
-            
-            # 根据匹配类型搜索
-            if match_type == 'exact':
-                chapters = search_chapters_exact(query, document_ids if document_ids else None, search_scope)
-            else:
-                chapters = search_chapters_fuzzy(query, document_ids if document_ids else None, search_scope)
-            
-            # 按文档分组
-            doc_results = {}
-            for chapter in chapters:
-                doc_id = chapter['document_id']
-                if doc_id not in doc_results:
-                    doc_results[doc_id] = {
-                        'document_id': doc_id,
-                        'filename': chapter.get('doc_filename', '未知文档'),
-                        'chapters': []
-                    }
-                
-                # 获取章节的层级路径
-                chapter['path'] = get_chapter_path(chapter['id'])
-                
-                # 获取章节图片
-                images = get_chapter_images(chapter['id'])
-                chapter['images'] = images
-                
-                # 如果需要包含子章节
-                if include_children:
-                    children = get_chapter_with_children(chapter['id'], doc_id)
-                    if len(children) > 1:
-                        chapter['children'] = children[1:]
-                
-                doc_results[doc_id]['chapters'].append(chapter)
-            
-            all_results.append({
-                'query': query,
-                'results': list(doc_results.values()),
-                'match_count': len(chapters)
-            })
+        # 各条查询相互独立，几乎全是数据库往返等待，用有界线程池并发执行；
+        # 工作线程不在请求上下文中，每条查询的全部 SQL 共用一个从连接池取出的连接
+        all_results = []
+        if stripped_queries:
+            max_workers = min(Config.CHAT_BATCH_SEARCH_MAX_WORKERS, len(stripped_queries))
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                all_results = list(executor.map(
+                    lambda query: _batch_search_one(query, match_type, document_ids, search_scope, include_children),
+                    stripped_queries
+                ))
         
         return jsonify({
             'success': True,
@@ -566,14 +806,14 @@ def export_to_word():
                     # 添加章节（带路径和序号）
                     add_chapter_with_path(doc, chapter, global_chapter_index, filename)
         
-        # 保存到临时文件
-        temp_dir = tempfile.gettempdir()
+        # 直接保存到内存中发送，不落临时文件
         filename = f"查询结果_{datetime.now().strftime('%Y%m%d_%H%M%S')}.docx"
-        filepath = os.path.join(temp_dir, filename)
-        doc.save(filepath)
+        buffer = io.BytesIO()
+        doc.save(buffer)
+        buffer.seek(0)
         
         return send_file(
-            filepath,
+            buffer,
             as_attachment=True,
             download_name=filename,
             mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document'
@@ -801,7 +1041,6 @@ def _add_content_with_tables(doc, content, images):
     """
     from docx.shared import Inches, Pt
     from docx.oxml.ns import qn
-    import re
     
     # 构建图片ID映射
     img_map = {}
@@ -810,17 +1049,12 @@ def _add_content_with_tables(doc, content, images):
         if img_id:
             img_map[str(img_id)] = img.get('image_path', '')
     
-    # 正则：匹配 [表格]...[/表格] 块
-    table_pattern = re.compile(r'\[表格\](.*?)\[/表格\]', re.DOTALL)
-    # 正则：匹配图片占位符
-    image_pattern = re.compile(r'\{\{IMAGE_ID_(\d+)\}\}')
-    
     last_end = 0
-    for match in table_pattern.finditer(content):
+    for match in _TABLE_BLOCK_RE.finditer(content):
         # 添加表格之前的普通文本
         before_text = content[last_end:match.start()]
         if before_text.strip():
-            _add_text_with_images(doc, before_text, img_map, image_pattern)
+            _add_text_with_images(doc, before_text, img_map)
         
         # 表格内容
         table_content = match.group(1).strip()
@@ -830,24 +1064,24 @@ def _add_content_with_tables(doc, content, images):
             table.style = 'Table Grid'
             cell = table.cell(0, 0)
             # 把表格内容（可能含图片占位符）写入单元格
-            _add_cell_content_with_images(cell, table_content, img_map, image_pattern)
+            _add_cell_content_with_images(cell, table_content, img_map)
         
         last_end = match.end()
     
     # 添加最后剩余的普通文本
     remaining = content[last_end:]
     if remaining.strip():
-        _add_text_with_images(doc, remaining, img_map, image_pattern)
+        _add_text_with_images(doc, remaining, img_map)
 
 
-def _add_text_with_images(doc, text, img_map, image_pattern):
+def _add_text_with_images(doc, text, img_map):
     """
     将文本添加到文档，遇到 {{IMAGE_ID_xxx}} 替换为图片
     """
     from docx.shared import Inches
     
     last_end = 0
-    for match in image_pattern.finditer(text):
+    for match in _IMAGE_ID_RE.finditer(text):
         # 图片之前的文字
         before = text[last_end:match.start()]
         if before.strip():
@@ -870,7 +1104,7 @@ def _add_text_with_images(doc, text, img_map, image_pattern):
         doc.add_paragraph(remaining.strip())
 
 
-def _add_cell_content_with_images(cell, text, img_map, image_pattern):
+def _add_cell_content_with_images(cell, text, img_map):
     """
     将文本添加到表格单元格，遇到 {{IMAGE_ID_xxx}} 替换为图片
     """
@@ -880,7 +1114,7 @@ def _add_cell_content_with_images(cell, text, img_map, image_pattern):
     cell.text = ''
     
     last_end = 0
-    for match in image_pattern.finditer(text):
+    for match in _IMAGE_ID_RE.finditer(text):
         # 图片之前的文字
         before = text[last_end:match.start()]
         if before.strip():
@@ -1018,20 +1252,8 @@ def select_document_for_conflict():
         else:
             chapters = search_chapters_fuzzy(query, [selected_doc_id])
         
-        results = []
-        for chapter in chapters:
-            # 获取章节的层级路径
-            chapter['path'] = get_chapter_path(chapter['id'])
-            
-            images = get_chapter_images(chapter['id'])
-            chapter['images'] = images
-            
-            if include_children:
-                children = get_chapter_with_children(chapter['id'], selected_doc_id)
-                if len(children) > 1:
-                    chapter['children'] = children[1:]
-            
-            results.append(chapter)
+        # 批量补全命中章节的层级路径、图片和子章节
+        results = _attach_chapter_details(chapters, include_children, selected_doc_id)
         
         return jsonify({
             'success': True,
@@ -1394,7 +1616,7 @@ def parse_bid_instruction():
         解析出的章节编号和对应的技术要求
     """
     try:
-        from .bid_document_parser import UserInstructionParser, BidResponseGenerator
+        from .bid_document_parser import parse_user_instruction, BidResponseGenerator
         
         data = request.json
         instruction = data.get('instruction', '').strip()
@@ -1408,8 +1630,7 @@ def parse_bid_instruction():
             }), 400
         
         # 解析用户指令
-        parser = UserInstructionParser()
-        instruction_info = parser.parse_instruction(instruction)
+        instruction_info = parse_user_instruction(instruction)
         
         if not instruction_info['parsed']:
             return jsonify({
@@ -1455,7 +1676,7 @@ def parse_bid_document_api():
         文档的完整章节结构
     """
     try:
-        from .bid_document_parser import BidDocumentParser
+        from .bid_document_parser import parse_bid_document
         
         data = request.json
         doc_id = data.get('doc_id')
@@ -1494,8 +1715,7 @@ def parse_bid_document_api():
             }), 404
         
         # 解析文档结构
-        parser = BidDocumentParser(file_path)
-        structure = parser.parse_document_structure()
+        structure = parse_bid_document(file_path)
         
         # 转换为列表格式便于前端展示
         sections_list = []
@@ -1543,7 +1763,7 @@ def get_section_requirements():
         各章节的技术要求详情（解析每一条具体要求）
     """
     try:
-        from .bid_document_parser import BidDocumentParser
+        from .bid_document_parser import load_bid_document
         
         data = request.json
         doc_id = data.get('doc_id')
@@ -1587,8 +1807,7 @@ def get_section_requirements():
         
         # 【核心修改】直接解析文档文件，而不是从数据库查
         logger.info(f"解析文档: {file_path}")
-        parser = BidDocumentParser(file_path)
-        parser.parse_document_structure()
+        parser = load_bid_document(file_path)
         
         # 打印解析到的所有章节编号
         all_section_numbers = list(parser.section_index.keys())
@@ -1648,6 +1867,143 @@ def get_section_requirements():
         }), 500
 
 
+def _collect_bid_answer_requirements(doc_id, section_numbers):
+    """
+    从招标文档中收集指定章节的全部技术要求（同步/异步作答接口共用）
+    
+    Returns:
+        (文档信息, 技术要求列表, None)；参数或文档有误时返回 (None, None, (错误响应, 状态码))
+    """
+    from .bid_document_parser import load_bid_document
+    
+    if not doc_id:
+        return None, None, (jsonify({
+            'success': False,
+            'error': '请提供文档ID'
+        }), 400)
+    
+    if not section_numbers:
+        return None, None, (jsonify({
+            'success': False,
+            'error': '请提供要作答的章节编号'
+        }), 400)
+    
+    # 获取文档路径
+    sql = """
+        SELECT dpr.final_path, dpr.filename
+        FROM doc_process_records dpr
+        WHERE dpr.doc_id = %s AND dpr.status = 'completed'
+    """
+    doc_info = fetch_one(sql, (doc_id,))
+    
+    if not doc_info or not doc_info['final_path']:
+        return None, None, (jsonify({
+            'success': False,
+            'error': '文档不存在或未处理完成'
+        }), 404)
+    
+    file_path = doc_info['final_path']
+    
+    # 检查文件是否存在
+    if not file_path or not os.path.exists(file_path):
+        return None, None, (jsonify({
+            'success': False,
+            'error': f'文档文件不存在: {file_path}'
+        }), 404)
+    
+    # 【核心修改】直接解析文档文件
+    logger.info(f"answer_bid_requirements - 解析文档: {file_path}")
+    parser = load_bid_document(file_path)
+    
+    all_section_numbers = list(parser.section_index.keys())
+    logger.info(f"文档解析到的章节编号: {all_section_numbers}")
+    
+    all_requirements = []
+    
+    for num in section_numbers:
+        logger.info(f"从文档获取章节 {num}...")
+        
+        # 使用 BidDocumentParser 获取章节的所有需求
+        requirements = parser.get_all_requirements_from_section(num)
+        
+        if requirements:
+            logger.info(f"章节 {num} 获取到 {len(requirements)} 条需求")
+            for req in requirements:
+                all_requirements.append({
+                    'section_number': num,
+                    'section_title': req.get('section_title', ''),
+                    'index': req.get('index', ''),
+                    'content': req.get('text', ''),
+                    'spec': req.get('spec', ''),
+                    'type': req.get('type', 'list')
+                })
+        else:
+            logger.warning(f"章节 {num} 未找到，可用章节: {all_section_numbers}")
+    
+    logger.info(f"从文档获取到 {len(all_requirements)} 条需求")
+    
+    if not all_requirements:
+        return None, None, (jsonify({
+            'success': False,
+            'error': f'未找到需要作答的技术要求，可用章节: {all_section_numbers}'
+        }), 400)
+    
+    return doc_info, all_requirements, None
+
+
+def _summarize_bid_answers(results):
+    """按匹配方式统计作答结果"""
+    return {
+        'total': len(results),
+        'exact': sum(1 for r in results if r['match_type'] == 'exact'),
+        'semantic': sum(1 for r in results if r['match_type'] == 'semantic'),
+        'web': sum(1 for r in results if r['match_type'] == 'web'),
+        'llm_generated': sum(1 for r in results if r['match_type'] == 'llm_generated'),
+        'none': sum(1 for r in results if r['match_type'] in ['none', 'error'])
+    }
+
+
+_WORD_MIMETYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+
+
+def _send_export_file(filepath, filename):
+    """发送导出目录中的Word文档，响应结束后删除文件"""
+    from .bid_document_parser import remove_export_file
+    
+    response = send_file(
+        filepath,
+        as_attachment=True,
+        download_name=filename,
+        mimetype=_WORD_MIMETYPE
+    )
+    response.call_on_close(lambda: remove_export_file(filepath))
+    return response
+
+
+def _task_owner_key(task_id):
+    return f'bid_task_owner:{task_id}'
+
+
+def _remember_task_owner(task_id):
+    """记录提交异步任务的用户，保留时间与任务结果相同"""
+    user_info = session.get('user') or {}
+    redis_client.setex(_task_owner_key(task_id), Config.CELERY_RESULT_EXPIRES, str(user_info.get('id')))
+
+
+def _is_task_owner(task_id):
+    """当前登录用户是否为该异步任务的提交者"""
+    user_info = session.get('user') or {}
+    owner = redis_client.get(_task_owner_key(task_id))
+    return owner is not None and owner == str(user_info.get('id'))
+
+
+def _task_not_found():
+    return jsonify({
+        'success': False,
+        'error': '任务不存在'
+    }), 404
+
+
 @chatdoc.route('/api/chat/answer-bid-requirements', methods=['POST'])
 def answer_bid_requirements():
     """
@@ -1665,8 +2021,7 @@ def answer_bid_requirements():
         各技术要求的作答结果（对每一条具体要求分别作答）
     """
     try:
-        from .bid_document_parser import BidDocumentParser, BidAnswerGenerator
-        import os
+        from .bid_document_parser import BidAnswerGenerator
         
         user_info = session.get('user')
         username = user_info.get('username') if user_info else 'anonymous'
@@ -1679,78 +2034,9 @@ def answer_bid_requirements():
         enable_web_search = data.get('enable_web_search', True)
         export_format = data.get('export_format', 'json')
         
-        if not doc_id:
-            return jsonify({
-                'success': False,
-                'error': '请提供文档ID'
-            }), 400
-        
-        if not section_numbers:
-            return jsonify({
-                'success': False,
-                'error': '请提供要作答的章节编号'
-            }), 400
-        
-        # 获取文档路径
-        sql = """
-            SELECT dpr.final_path, dpr.filename
-            FROM doc_process_records dpr
-            WHERE dpr.doc_id = %s AND dpr.status = 'completed'
-        """
-        doc_info = fetch_one(sql, (doc_id,))
-        
-        if not doc_info or not doc_info['final_path']:
-            return jsonify({
-                'success': False,
-                'error': '文档不存在或未处理完成'
-            }), 404
-        
-        file_path = doc_info['final_path']
-        
-        # 检查文件是否存在
-        if not file_path or not os.path.exists(file_path):
-            return jsonify({
-                'success': False,
-                'error': f'文档文件不存在: {file_path}'
-            }), 404
-        
-        # 【核心修改】直接解析文档文件
-        logger.info(f"answer_bid_requirements - 解析文档: {file_path}")
-        parser = BidDocumentParser(file_path)
-        parser.parse_document_structure()
-        
-        all_section_numbers = list(parser.section_index.keys())
-        logger.info(f"文档解析到的章节编号: {all_section_numbers}")
-        
-        all_requirements = []
-        
-        for num in section_numbers:
-            logger.info(f"从文档获取章节 {num}...")
-            
-            # 使用 BidDocumentParser 获取章节的所有需求
-            requirements = parser.get_all_requirements_from_section(num)
-            
-            if requirements:
-                logger.info(f"章节 {num} 获取到 {len(requirements)} 条需求")
-                for req in requirements:
-                    all_requirements.append({
-                        'section_number': num,
-                        'section_title': req.get('section_title', ''),
-                        'index': req.get('index', ''),
-                        'content': req.get('text', ''),
-                        'spec': req.get('spec', ''),
-                        'type': req.get('type', 'list')
-                    })
-            else:
-                logger.warning(f"章节 {num} 未找到，可用章节: {all_section_numbers}")
-        
-        logger.info(f"从文档获取到 {len(all_requirements)} 条需求")
-        
-        if not all_requirements:
-            return jsonify({
-                'success': False,
-                'error': f'未找到需要作答的技术要求，可用章节: {all_section_numbers}'
-            }), 400
+        doc_info, all_requirements, error = _collect_bid_answer_requirements(doc_id, section_numbers)
+        if error:
+            return error
         
         logger.info(f"开始处理 {len(all_requirements)} 条技术要求")
         
@@ -1764,14 +2050,7 @@ def answer_bid_requirements():
         )
         
         # 统计
-        summary = {
-            'total': len(results),
-            'exact': sum(1 for r in results if r['match_type'] == 'exact'),
-            'semantic': sum(1 for r in results if r['match_type'] == 'semantic'),
-            'web': sum(1 for r in results if r['match_type'] == 'web'),
-            'llm_generated': sum(1 for r in results if r['match_type'] == 'llm_generated'),
-            'none': sum(1 for r in results if r['match_type'] in ['none', 'error'])
-        }
+        summary = _summarize_bid_answers(results)
         
         # 如果需要导出Word
         if export_format in ['word', 'word_table']:
@@ -1787,12 +2066,7 @@ def answer_bid_requirements():
                 bid_doc_info=bid_doc_info
             )
             
-            return send_file(
-                filepath,
-                as_attachment=True,
-                download_name=filename,
-                mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-            )
+            return _send_export_file(filepath, filename)
         
         return jsonify({
             'success': True,
@@ -1814,6 +2088,103 @@ def answer_bid_requirements():
         }), 500
 
 
+@chatdoc.route('/api/chat/answer-bid-requirements/async', methods=['POST'])
+def answer_bid_requirements_async():
+    """
+    异步作答招标技术要求：要求按批拆成并行的 Celery 子任务，适合要求条数较多的文档
+    
+    请求参数同 /api/chat/answer-bid-requirements（不支持 export_format），返回 task_id，
+    之后通过 /api/chat/answer-bid-requirements/<task_id> 查询状态和作答结果
+    """
+    try:
+        from .bid_document_parser import answer_bid_requirements_async as submit_answer_batches
+        
+        user_info = session.get('user')
+        username = user_info.get('username') if user_info else 'anonymous'
+        
+        data = request.json
+        doc_id = data.get('doc_id')
+        section_numbers = data.get('section_numbers', [])
+        knowledge_doc_ids = data.get('knowledge_doc_ids', [])
+        llm_config_id = data.get('llm_config_id')
+        enable_web_search = data.get('enable_web_search', True)
+        
+        doc_info, all_requirements, error = _collect_bid_answer_requirements(doc_id, section_numbers)
+        if error:
+            return error
+        
+        task_id = submit_answer_batches(
+            all_requirements,
+            username,
+            knowledge_doc_ids if knowledge_doc_ids else None,
+            llm_config_id,
+            enable_web_search
+        )
+        _remember_task_owner(task_id)
+        logger.info(f"已提交 {len(all_requirements)} 条技术要求的异步作答任务: {task_id}")
+        
+        return jsonify({
+            'success': True,
+            'task_id': task_id,
+            'total': len(all_requirements),
+            'doc_info': {
+                'doc_id': doc_id,
+                'filename': doc_info['filename']
+            }
+        })
+        
+    except Exception as e:
+        logger.error(f"提交招标需求作答任务失败: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@chatdoc.route('/api/chat/answer-bid-requirements/<task_id>', methods=['GET'])
+def get_bid_requirements_answers(task_id):
+    """
+    查询异步作答任务：未完成时返回任务状态，完成后返回全部作答结果及统计；只有提交任务的用户可以查询
+    """
+    try:
+        from .bid_document_parser import merge_bid_answer_batches_task
+        
+        if not _is_task_owner(task_id):
+            return _task_not_found()
+        
+        task = merge_bid_answer_batches_task.AsyncResult(task_id)
+        
+        if task.state == 'SUCCESS':
+            results = task.result
+            return jsonify({
+                'success': True,
+                'state': task.state,
+                'data': {
+                    'results': results,
+                    'summary': _summarize_bid_answers(results)
+                }
+            })
+        
+        if task.state == 'FAILURE':
+            return jsonify({
+                'success': False,
+                'state': task.state,
+                'error': str(task.info) if task.info else 'Unknown error'
+            }), 500
+        
+        return jsonify({
+            'success': True,
+            'state': task.state
+        })
+        
+    except Exception as e:
+        logger.error(f"查询招标需求作答任务失败: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
 @chatdoc.route('/api/chat/export-bid-answers', methods=['POST'])
 def export_bid_answers():
     """
@@ -1847,12 +2218,7 @@ def export_bid_answers():
         else:
             filepath, filename = generator.export_to_word(results, title, doc_info)
         
-        return send_file(
-            filepath,
-            as_attachment=True,
-            download_name=filename,
-            mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-        )
+        return _send_export_file(filepath, filename)
         
     except Exception as e:
         logger.error(f"导出招标作答失败: {e}")
@@ -1862,6 +2228,90 @@ def export_bid_answers():
         }), 500
 
 
+@chatdoc.route('/api/chat/export-bid-answers/async', methods=['POST'])
+def export_bid_answers_async():
+    """
+    异步导出招标作答结果为Word文档（由 Celery worker 生成，适合大批量结果）
+    
+    请求参数同 /api/chat/export-bid-answers，返回 task_id，
+    之后通过 /api/chat/export-bid-answers/<task_id> 查询状态并下载
+    """
+    try:
+        from .bid_document_parser import export_bid_answers_task
+        
+        data = request.json
+        results = data.get('results', [])
+        title = data.get('title', '招标技术要求应答书')
+        doc_info = data.get('doc_info')
+        format_type = data.get('format_type', 'default')
+        
+        if not results:
+            return jsonify({
+                'success': False,
+                'error': '没有可导出的结果'
+            }), 400
+        
+        task = export_bid_answers_task.delay(results, title, doc_info, format_type)
+        _remember_task_owner(task.id)
+        
+        return jsonify({
+            'success': True,
+            'task_id': task.id
+        })
+        
+    except Exception as e:
+        logger.error(f"提交招标作答导出任务失败: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@chatdoc.route('/api/chat/export-bid-answers/<task_id>', methods=['GET'])
+def get_bid_answers_export(task_id):
+    """
+    查询异步导出任务：未完成时返回任务状态，完成后直接下载生成的Word文档（下载后文件即被删除）；
+    只有提交任务的用户可以查询
+    """
+    try:
+        from .bid_document_parser import export_bid_answers_task
+        
+        if not _is_task_owner(task_id):
+            return _task_not_found()
+        
+        task = export_bid_answers_task.AsyncResult(task_id)
+        
+        if task.state == 'SUCCESS':
+            filepath = task.result.get('filepath', '')
+            export_folder = os.path.abspath(Config.BID_EXPORT_FOLDER)
+            if os.path.dirname(os.path.abspath(filepath)) != export_folder or not os.path.exists(filepath):
+                return jsonify({
+                    'success': False,
+                    'error': '导出文件不存在'
+                }), 404
+            
+            return _send_export_file(filepath, task.result.get('filename'))
+        
+        if task.state == 'FAILURE':
+            return jsonify({
+                'success': False,
+                'state': task.state,
+                'error': str(task.info) if task.info else 'Unknown error'
+            }), 500
+        
+        return jsonify({
+            'success': True,
+            'state': task.state
+        })
+        
+    except Exception as e:
+        logger.error(f"查询招标作答导出任务失败: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
 # ==================== Embedding 向量化相关 API ====================
 
 @chatdoc.route('/api/chat/embedding/vectorize', methods=['POST'])
@@ -11,6 +11,7 @@ Embedding 服务模块
 import os
 import json
 import hashlib
+import heapq
 import struct
 import numpy as np
 from typing import List, Dict, Optional, Union, Tuple
@@ -18,7 +19,7 @@ from abc import ABC, abstractmethod
 from datetime import datetime
 
 from config.logging_config import logger
-from config.db_config import fetch_one, fetch_all, dml_sql, dml_sql_with_insert_id
+from config.db_config import fetch_one, fetch_all, dml_sql, dml_sql_with_insert_id, dml_many, iter_rows
 
 
 class EmbeddingProvider(ABC):
@@ -629,15 +630,16 @@ class VectorStore:
             try:
                 embeddings = self.embedding_service.embed_texts(texts)
                 
+                # 存储到数据库（整批一次写入）
+                sql = """
+                    INSERT INTO document_embeddings 
+                    (document_id, chapter_id, content_type, content_hash, content_text,
+                     content_summary, embedding, embedding_model, dimensions, metadata)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                """
+                rows = []
                 for item, embedding in zip(batch, embeddings):
-                    # 存储到数据库
-                    sql = """
-                        INSERT INTO document_embeddings 
-                        (document_id, chapter_id, content_type, content_hash, content_text,
-                         content_summary, embedding, embedding_model, dimensions, metadata)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    """
-                    params = (
+                    rows.append((
                         item['document_id'],
                         item['chapter_id'],
                         'chapter',
@@ -648,13 +650,20 @@ class VectorStore:
                         model_name,
                         dimensions,
                         json.dumps(item['metadata'], ensure_ascii=False)
-                    )
-                    
-                    try:
-                        dml_sql(sql, params)
-                        success_count += 1
-                    except Exception as e:
-                        logger.error(f"存储向量失败: {e}")
+                    ))
+                
+                try:
+                    dml_many(sql, rows)
+                    success_count += len(rows)
+                except Exception as e:
+                    # 整批写入已回滚，逐条重试，只跳过写入失败的行，其余向量照常入库
+                    logger.warning(f"批量存储向量失败，改为逐条写入: {e}")
+                    for item, params in zip(batch, rows):
+                        try:
+                            dml_sql(sql, params)
+                            success_count += 1
+                        except Exception as e:
+                            logger.error(f"存储向量失败 (chapter_id={item['chapter_id']}): {e}")
                         
             except Exception as e:
                 logger.error(f"批量生成向量失败: {e}")
@@ -695,54 +704,47 @@ class VectorStore:
             WHERE {' AND '.join(conditions)}
         """
         
-        candidates = fetch_all(sql, params if params else None)
-        
-        if not candidates:
-            return []
-        
-        # 计算相似度
-        results = []
+        # 计算相似度（候选向量流式读取，不整体加载到内存）
         query_np = np.array(query_embedding)
         query_norm = np.linalg.norm(query_np)
         
-        for candidate in candidates:
-            try:
-                embedding = self._bytes_to_vector(candidate['embedding'])
-                candidate_np = np.array(embedding)
-                candidate_norm = np.linalg.norm(candidate_np)
-                
-                # 余弦相似度
-                if query_norm > 0 and candidate_norm > 0:
-                    similarity = np.dot(query_np, candidate_np) / (query_norm * candidate_norm)
-                else:
-                    similarity = 0
-                
-                if similarity >= threshold:
-                    metadata = {}
-                    if candidate.get('metadata'):
-                        if isinstance(candidate['metadata'], str):
-                            metadata = json.loads(candidate['metadata'])
-                        else:
-                            metadata = candidate['metadata']
+        def scored_candidates():
+            for candidate in iter_rows(sql, params if params else None):
+                try:
+                    embedding = self._bytes_to_vector(candidate['embedding'])
+                    candidate_np = np.array(embedding)
+                    candidate_norm = np.linalg.norm(candidate_np)
                     
-                    results.append({
-                        'id': candidate['id'],
-                        'document_id': candidate['document_id'],
-                        'chapter_id': candidate['chapter_id'],
-                        'content': candidate['content_text'],
-                        'summary': candidate['content_summary'],
-                        'similarity': float(similarity),
-                        'metadata': metadata
-                    })
+                    # 余弦相似度
+                    if query_norm > 0 and candidate_norm > 0:
+                        similarity = np.dot(query_np, candidate_np) / (query_norm * candidate_norm)
+                    else:
+                        similarity = 0
                     
-            except Exception as e:
-                logger.error(f"计算相似度失败: {e}")
-                continue
-        
-        # 按相似度排序
-        results.sort(key=lambda x: x['similarity'], reverse=True)
+                    if similarity >= threshold:
+                        metadata = {}
+                        if candidate.get('metadata'):
+                            if isinstance(candidate['metadata'], str):
+                                metadata = json.loads(candidate['metadata'])
+                            else:
+                                metadata = candidate['metadata']
+                        
+                        yield {
+                            'id': candidate['id'],
+                            'document_id': candidate['document_id'],
+                            'chapter_id': candidate['chapter_id'],
+                            'content': candidate['content_text'],
+                            'summary': candidate['content_summary'],
+                            'similarity': float(similarity),
+                            'metadata': metadata
+                        }
+                        
+                except Exception as e:
+                    logger.error(f"计算相似度失败: {e}")
+                    continue
         
-        return results[:top_k]
+        # 按相似度取前 top_k 个，堆中只保留 top_k 条结果
+        return heapq.nlargest(top_k, scored_candidates(), key=lambda x: x['similarity'])
     
     def delete_document_embeddings(self, document_id: int) -> int:
         """删除文档的所有向量"""
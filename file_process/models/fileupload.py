@@ -5,16 +5,14 @@ import os
 import hashlib
 import redis
 import json
-import sys
 from datetime import datetime, timedelta
 from celery import Celery
 #from celery import shared_task
 from .celery_app import celery
+from extensions import redis_client as shared_redis_client
 
 from config.logging_config import logger  # type: ignore
 
-# 添加父目录到路径，以便导入统一配置
-sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))))
 from config.app_config import Config
 
 
@@ -37,10 +35,8 @@ ALLOWED_EXTENSIONS = {'docx', 'pdf', 'txt'}
 
 # ============ 2. Redis配置 (仅用于缓存和 Celery Broker) ============
 try:
-    # 使用统一配置创建Redis连接
-    redis_config = Config.get_redis_config_dict()
-    redis_pool = redis.ConnectionPool(**redis_config)
-    redis_client = redis.Redis(connection_pool=redis_pool)
+    # 使用应用共享的Redis客户端
+    redis_client = shared_redis_client
     redis_client.ping()
     redis_available = True
 except Exception as e:
@@ -631,7 +627,7 @@ def get_merge_status(task_id):
 # ============ Celery异步任务 ============
 # 不使用 @celery.task，改用 @shared_task
 # 这样它会自动绑定到当前运行的 app 上的 celery 实例
-@celery.task(bind=True, max_retries=3)
+@celery.task(bind=True, max_retries=3, ignore_result=False)
 def merge_chunks_task(self, upload_id):
     """合并分片文件"""
     try:
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify, session, send_file
-from config.db_config import fetch_one, fetch_all, dml_sql
+from config.db_config import fetch_one, fetch_all, fetch_all_cached, dml_sql
 from .celery_app import celery
+from celery.signals import worker_ready
 import os
 import re
 import json
@@ -102,6 +103,13 @@ def recover_orphaned_tasks():
         logger.error(f"恢复孤儿任务时发生错误: {e}")
 
 
+@worker_ready.connect
+def recover_orphaned_tasks_on_worker_ready(**kwargs):
+    """Celery worker 启动完成后恢复一次孤儿任务（每个 worker 一次，不随 Web 进程数重复执行）"""
+    recover_orphaned_tasks()
+    logger.info("worker 启动时任务恢复检查完成")
+
+
 @doc_proc.route('/api/doc-process/recover-tasks', methods=['POST'])
 def recover_tasks_api():
     """手动触发任务恢复的API接口"""
@@ -134,7 +142,8 @@ def get_doc_process_list():
             ORDER BY created_at DESC
         """
 
-        records = fetch_all(sql, parameters=(username,))
+        # 列表页轮询频繁，结果走 Redis 缓存；状态变更都经 dml_sql 写入，会使缓存失效
+        records = fetch_all_cached(sql, parameters=(username,))
 
         # 格式化返回数据
         for record in records:
@@ -777,7 +786,7 @@ def get_document_chapters():
 @celery.task(bind=True, max_retries=3)
 def process_document_task(self, doc_id, file_path, username, filename):
     """Celery异步处理文档任务"""
-    from config.db_config import dml_sql as task_dml_sql, query_sql, dml_sql_with_insert_id
+    from config.db_config import dml_sql as task_dml_sql, query_sql, dml_sql_with_insert_id, dml_many
 
     try:
         from pathlib import Path
@@ -846,6 +855,8 @@ def process_document_task(self, doc_id, file_path, username, filename):
 
                 # 记录 order_in_doc -> image_id，用于回写章节 content 占位符
                 order_to_image_id: dict[int, int] = {}
+                # 章节-图片关联在循环结束后批量写入
+                chapter_image_rows = []
 
                 for img in images:
                     # 插入图片并获取图片ID
@@ -886,16 +897,15 @@ def process_document_task(self, doc_id, file_path, username, filename):
 
                     # 建立章节-图片关联（带章节内顺序）
                     if target_chapter_id and image_id:
-                        chapter_image_sql = """
-                            INSERT INTO chapter_images (chapter_id, image_id, position_in_chapter)
-                            VALUES (%s, %s, %s)
-                        """
-                        task_dml_sql(
-                            chapter_image_sql,
-                            (target_chapter_id, image_id, position_int)
-                        )
+                        chapter_image_rows.append((target_chapter_id, image_id, position_int))
+
+                dml_many("""
+                    INSERT INTO chapter_images (chapter_id, image_id, position_in_chapter)
+                    VALUES (%s, %s, %s)
+                """, chapter_image_rows)
 
                 # E. 回写章节 content：将 IMAGE_ORDER 占位符替换为 IMAGE_ID 占位符
+                content_updates = []
                 for c in chapters:
                     chapter_db_id = temp_to_real_id.get(c['temp_id'])
                     if not chapter_db_id:
@@ -911,10 +921,9 @@ def process_document_task(self, doc_id, file_path, username, filename):
 
                     new_content = re.sub(r"\{\{IMAGE_ORDER_(\d+)\}\}", _repl, content)
                     if new_content != content:
-                        task_dml_sql(
-                            "UPDATE chapters SET content=%s WHERE id=%s",
-                            parameters=(new_content, chapter_db_id)
-                        )
+                        content_updates.append((new_content, chapter_db_id))
+
+                dml_many("UPDATE chapters SET content=%s WHERE id=%s", content_updates)
 
                 result = {
                     "status": "success", 
@@ -11,6 +11,7 @@ from config.db_config import (
     dml_sql,
     query_sql,
     dml_sql_with_insert_id,
+    dml_many,
     close_db_connection,
 )
 
@@ -380,6 +381,7 @@ def process_word_task(self, doc_id, file_path, username):
         """
 
         order_to_image_id: dict[int, int] = {}
+        chapter_image_rows = []
         for img in images:
             image_id, _ = dml_sql_with_insert_id(
                 img_sql,
@@ -399,19 +401,24 @@ def process_word_task(self, doc_id, file_path, username):
 
                 chapter_db_id = temp_to_real_id.get(img.get("chapter_temp_id"))
                 if chapter_db_id:
-                    dml_sql(
-                        """
-                        INSERT INTO chapter_images (chapter_id, image_id, position_in_chapter)
-                        VALUES (%s, %s, %s)
-                        """,
+                    chapter_image_rows.append(
                         (
                             chapter_db_id,
                             image_id,
                             int(img.get("position_in_chapter", 0)),
-                        ),
+                        )
                     )
 
+        dml_many(
+            """
+            INSERT INTO chapter_images (chapter_id, image_id, position_in_chapter)
+            VALUES (%s, %s, %s)
+            """,
+            chapter_image_rows,
+        )
+
         # 将章节 content 的 IMAGE_ORDER 占位符替换为 IMAGE_ID 占位符
+        content_updates = []
         for c in chapters:
             chapter_db_id = temp_to_real_id.get(c["temp_id"])
             if not chapter_db_id:
@@ -427,7 +434,9 @@ def process_word_task(self, doc_id, file_path, username):
 
             new_content = re.sub(r"\{\{IMAGE_ORDER_(\d+)\}\}", _repl, content)
             if new_content != content:
-                dml_sql("UPDATE chapters SET content=%s WHERE id=%s", (new_content, chapter_db_id))
+                content_updates.append((new_content, chapter_db_id))
+
+        dml_many("UPDATE chapters SET content=%s WHERE id=%s", content_updates)
 
         return {"status": "success", "doc_id": doc_id, "chapters": len(chapters), "images": len(images)}
 
@@ -0,0 +1,7 @@
+-- 章节全文索引
+-- 招标作答精确匹配按 MATCH(title, content) AGAINST 检索候选章节，中文需使用 ngram 分词（MySQL 5.7.6+）
+-- 文档对话按内容精确搜索（search_chapters_exact）时，纯中文查询用该索引做短语预筛
+-- 未建索引时两处都会回退到 LIKE 查询
+
+ALTER TABLE chapters
+    ADD FULLTEXT INDEX ft_title_content (title, content) WITH PARSER ngram;
@@ -0,0 +1,6 @@
+-- 用户表调整
+-- password 字段改为保存 bcrypt 哈希（60 字符），登录按 username 唯一索引单键查询
+
+ALTER TABLE `user`
+    MODIFY `password` VARCHAR(100) NOT NULL COMMENT 'bcrypt 密码哈希',
+    ADD UNIQUE KEY idx_username (`username`);
@@ -97,7 +97,7 @@ echo ""
 
 # 检查依赖包
 echo "6. 检查Python依赖包..."
-packages=("flask" "celery" "redis" "pymysql")
+packages=("flask" "celery" "redis" "MySQLdb")
 for package in "${packages[@]}"; do
     if python -c "import $package" > /dev/null 2>&1; then
         echo "   ✅ $package 已安装"